@@ -0,0 +1,224 @@
+"""
+Резервное копирование базы данных без остановки бота
+"""
+
+import asyncio
+import datetime
+import glob
+import gzip
+import logging
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import quote
+
+
+logger = logging.getLogger(__name__)
+
+
+class BackupCancelled(Exception):
+    """Копирование прервано остановкой бота"""
+
+
+class Backup:
+    """
+    Горячая копия базы через online backup API SQLite.
+
+    Копия снимается отдельным соединением в отдельном потоке
+    (asyncio.to_thread): Connection.backup() нельзя прервать await-ом,
+    зато шаги по pages страниц идут без GIL, а между шагами поток спит
+    pause секунд, так что цикл событий и соединение бота не ждут копирования.
+
+    Перед копированием на исходном соединении открывается транзакция
+    чтения. В режиме WAL она не мешает боту писать, а копия получается
+    на момент начала (иначе каждая запись бота начинала бы копирование
+    заново). Пока идёт копирование, checkpoint не может укоротить WAL.
+    """
+
+    def __init__(self, db_name, output_dir="backups", hour=3, pages=1024, pause=0.005, compress=True, keep=7):
+        """
+        Параметры:
+        db_name - путь к базе данных
+        output_dir - куда складывать копии
+        hour - в котором часу (UTC) делать копию по расписанию
+        pages - сколько страниц копировать за один шаг
+        pause - пауза между шагами в секундах
+        compress - сжимать ли копию (gzip)
+        keep - сколько последних копий хранить
+        """
+        self.db_name = db_name
+        self.output_dir = output_dir
+        self.hour = hour
+        self.pages = pages
+        self.pause = pause
+        self.compress = compress
+        self.keep = keep
+
+        # Задача текущего копирования
+        self.task = None
+        # Поток копирования проверяет это событие на каждом шаге
+        self.cancelled = threading.Event()
+        # Прогресс: (осталось страниц, всего страниц)
+        self.progress = (0, 0)
+
+    def is_running(self):
+        """Идёт ли сейчас копирование"""
+        return self.task is not None and not self.task.done()
+
+    def schedule(self, job_queue):
+        """
+        Ставим ежедневное копирование в JobQueue.
+
+        Параметры:
+        job_queue - application.job_queue (None, если не установлен
+                    python-telegram-bot[job-queue])
+        """
+        if job_queue is None:
+            logger.warning("JobQueue недоступна, резервное копирование не запланировано")
+            return
+
+        job_queue.run_daily(
+            self.run_job,
+            time=datetime.time(hour=self.hour, tzinfo=datetime.timezone.utc),
+            name="db_backup"
+        )
+        logger.info("Резервное копирование запланировано на %02d:00 UTC", self.hour)
+
+    async def run_job(self, context):
+        """Колбэк для JobQueue"""
+        if self.is_running():
+            logger.warning("Резервное копирование уже идёт, пропускаем")
+            return
+        self.start()
+
+    def start(self, bot=None, chat_id=None):
+        """
+        Запускаем копирование в фоне.
+
+        Параметры:
+        bot, chat_id - кому отправить отчёт (необязательно)
+        """
+        self.task = asyncio.create_task(self.run_and_report(bot, chat_id))
+
+    async def stop(self):
+        """
+        Прерываем копирование (при остановке бота).
+        Недописанный файл удаляется.
+        """
+        if self.is_running():
+            self.cancelled.set()
+            await asyncio.wait({self.task})
+
+    async def run_and_report(self, bot, chat_id):
+        """Делаем копию и сообщаем результат"""
+        started = time.monotonic()
+        try:
+            path = await self.run()
+
+        except BackupCancelled:
+            logger.info("Резервное копирование прервано")
+            return
+
+        except Exception:
+            logger.exception("Ошибка при резервном копировании")
+            text = "❌ Не удалось сделать резервную копию"
+
+        else:
+            seconds = time.monotonic() - started
+            size = os.path.getsize(path) / 1024 / 1024
+            logger.info("Резервная копия готова: %s (%.1f МБ, %.1f с)", path, size, seconds)
+            text = f"💾 Резервная копия готова: {os.path.basename(path)} ({size:.1f} МБ, {seconds:.0f} с)"
+
+        if bot and chat_id:
+            try:
+                await bot.send_message(chat_id=chat_id, text=text)
+            except Exception:
+                logger.exception("Не удалось отправить отчёт о резервном копировании")
+
+    async def run(self):
+        """
+        Делаем копию базы.
+
+        Возвращает:
+        Путь к файлу копии
+        """
+        self.cancelled.clear()
+        return await asyncio.to_thread(self.make_snapshot)
+
+    def make_snapshot(self):
+        """
+        Копирование (выполняется в отдельном потоке).
+
+        Возвращает:
+        Путь к файлу копии
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+
+        name = os.path.splitext(os.path.basename(self.db_name))[0]
+        stamp = datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(self.output_dir, f"{name}-{stamp}.db")
+        tmp_path = path + ".tmp"
+
+        try:
+            source = sqlite3.connect(f"file:{quote(self.db_name)}", uri=True)
+            target = sqlite3.connect(tmp_path)
+            try:
+                # Транзакция чтения фиксирует состояние базы на время копирования
+                source.execute("BEGIN")
+                source.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchall()
+                source.backup(target, pages=self.pages, progress=self.on_progress, sleep=self.pause)
+            finally:
+                source.close()
+                target.close()
+
+            if self.compress:
+                path += ".gz"
+                with open(tmp_path, "rb") as file, gzip.open(path + ".tmp", "wb", compresslevel=6) as archive:
+                    while chunk := file.read(1024 * 1024):
+                        if self.cancelled.is_set():
+                            raise BackupCancelled()
+                        archive.write(chunk)
+                os.replace(path + ".tmp", path)
+                os.remove(tmp_path)
+            else:
+                os.replace(tmp_path, path)
+
+        except BaseException:
+            for leftover in (tmp_path, path + ".tmp"):
+                if os.path.exists(leftover):
+                    os.remove(leftover)
+            raise
+
+        self.remove_old_backups(name)
+        return path
+
+    def on_progress(self, status, remaining, total):
+        """
+        Вызывается после каждого шага копирования.
+        Параметр sleep у backup() действует только при занятой базе,
+        поэтому паузу между шагами делаем здесь.
+        """
+        self.progress = (remaining, total)
+        if self.cancelled.is_set():
+            raise BackupCancelled()
+        if remaining:
+            time.sleep(self.pause)
+
+    def remove_old_backups(self, name):
+        """Оставляем только keep последних копий"""
+        backups = sorted(
+            glob.glob(os.path.join(self.output_dir, f"{name}-*.db"))
+            + glob.glob(os.path.join(self.output_dir, f"{name}-*.db.gz"))
+        )
+        for path in backups[:-self.keep]:
+            os.remove(path)
+
+    def format_status(self):
+        """Состояние копирования в виде текста"""
+        if not self.is_running():
+            return "💾 Резервное копирование сейчас не идёт"
+
+        remaining, total = self.progress
+        done = (total - remaining) / total if total else 0
+        return f"💾 Идёт резервное копирование: {done:.0%}"
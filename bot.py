@@ -2,7 +2,22 @@
 Основной класс Telegram бота
 """
 
-from telegram.ext import Application, CommandHandler, MessageHandler, CallbackQueryHandler, filters
+import asyncio
+import logging
+import signal
+import time
+
+from telegram.ext import (
+    Application, ApplicationHandlerStop, CommandHandler, MessageHandler, CallbackQueryHandler, filters
+)
+
+from logs import current_handler, current_user_id
+
+
+logger = logging.getLogger(__name__)
+
+# Обработчики дольше этого (секунды) попадают в лог как предупреждение
+SLOW_UPDATE = 1.0
 
 
 class EnglishBot:
@@ -11,7 +26,8 @@ class EnglishBot:
     Собирает все компоненты вместе.
     """
 
-    def __init__(self, token, db, keyboards, handlers):
+    def __init__(self, token, db, keyboards, handlers, maintenance=None, profiler=None, reminders=None,
+                 backup=None, shutdown_timeout=10):
         """
         Инициализация бота.
 
@@ -20,11 +36,30 @@ class EnglishBot:
         db - объект базы данных
         keyboards - объект клавиатур
         handlers - объект обработчиков
+        maintenance - объект обслуживания базы (необязательно)
+        profiler - профилировщик обработчиков (необязательно)
+        reminders - ежедневные напоминания (необязательно)
+        backup - резервное копирование базы (необязательно)
+        shutdown_timeout - сколько секунд ждать незавершённые обработчики при остановке
         """
         self.token = token
         self.db = db
         self.keyboards = keyboards
         self.handlers = handlers
+        self.maintenance = maintenance
+        self.profiler = profiler
+        self.reminders = reminders
+        self.backup = backup
+        self.shutdown_timeout = shutdown_timeout
+
+        # Обработчики, которые выполняются прямо сейчас
+        self.in_flight = set()
+        # Принимаем ли новые обновления
+        self.accepting = True
+        # Событие остановки создаётся при запуске, внутри цикла событий
+        self.stop_event = None
+        # Обновления, пропущенные при остановке: [(update_id, user_id), ...]
+        self.dropped = []
 
         # Создаём приложение бота
         self.application = Application.builder().token(self.token).build()
@@ -32,42 +67,236 @@ class EnglishBot:
         # Настраиваем обработчики
         self.setup_handlers()
 
+        # Планируем обслуживание базы
+        if self.maintenance:
+            self.maintenance.schedule(self.application.job_queue)
+
+        # Планируем напоминания
+        if self.reminders:
+            self.reminders.schedule(self.application.job_queue)
+
+        # Планируем резервное копирование
+        if self.backup:
+            self.backup.schedule(self.application.job_queue)
+
     def setup_handlers(self):
         """
         Настройка обработчиков команд и сообщений.
         """
 
+        # Каждый обработчик оборачиваем в track(), чтобы при остановке
+        # дождаться тех, что ещё выполняются
+
         # Команды бота
-        self.application.add_handler(CommandHandler("start", self.handlers.start_command))
-        self.application.add_handler(CommandHandler("learn", self.handlers.learn_command))
-        self.application.add_handler(CommandHandler("add", self.handlers.add_word_command))
-        self.application.add_handler(CommandHandler("remove", self.handlers.remove_word_command))
-        self.application.add_handler(CommandHandler("list", self.handlers.list_command))
-        self.application.add_handler(CommandHandler("help", self.handlers.help_command))
+        self.application.add_handler(CommandHandler("start", self.track(self.handlers.start_command)))
+        self.application.add_handler(CommandHandler("learn", self.track(self.handlers.learn_command)))
+        self.application.add_handler(CommandHandler("type", self.track(self.handlers.mode_command)))
+        self.application.add_handler(CommandHandler("add", self.track(self.handlers.add_word_command)))
+        self.application.add_handler(CommandHandler("remove", self.track(self.handlers.remove_word_command)))
+        self.application.add_handler(
+            CommandHandler("remove_learned", self.track(self.handlers.remove_learned_command))
+        )
+        self.application.add_handler(CommandHandler("list", self.track(self.handlers.list_command)))
+        self.application.add_handler(CommandHandler("find", self.track(self.handlers.find_command)))
+        self.application.add_handler(CommandHandler("stats", self.track(self.handlers.stats_command)))
+        self.application.add_handler(CommandHandler("remind", self.track(self.handlers.remind_command)))
+        self.application.add_handler(CommandHandler("help", self.track(self.handlers.help_command)))
+
+        # Команды администратора
+        self.application.add_handler(CommandHandler("profile", self.track(self.handlers.profile_command)))
+        self.application.add_handler(CommandHandler("backup", self.track(self.handlers.backup_command)))
+        self.application.add_handler(CommandHandler("broadcast", self.track(self.handlers.broadcast_command)))
+        self.application.add_handler(
+            CommandHandler("broadcast_status", self.track(self.handlers.broadcast_status_command))
+        )
+        self.application.add_handler(
+            CommandHandler("broadcast_cancel", self.track(self.handlers.broadcast_cancel_command))
+        )
 
         # Обработчик нажатий на inline-кнопки (варианты ответов, удаление)
-        self.application.add_handler(CallbackQueryHandler(self.handlers.button_click))
+        self.application.add_handler(CallbackQueryHandler(self.track(self.handlers.button_click)))
 
         # Обработчик текстовых сообщений (кнопки главного меню, добавление через "=")
         self.application.add_handler(
-            MessageHandler(filters.TEXT & ~filters.COMMAND, self.handlers.handle_text_message)
+            MessageHandler(filters.TEXT & ~filters.COMMAND, self.track(self.handlers.handle_text_message))
         )
 
-        print("Обработчики настроены")
+        logger.info("Обработчики настроены")
+
+    def track(self, callback):
+        """
+        Оборачиваем обработчик, чтобы знать, какие обновления ещё в работе.
+
+        Обработчик запускается отдельной задачей: при остановке её можно
+        отменить по таймауту, не задев цикл обработки обновлений PTB.
+        Здесь же обработчик замеряется профилировщиком, если он включён,
+        и в лог пишется его длительность и ошибка, если она была.
+        """
+        handler = callback.__name__
+
+        async def wrapper(update, context):
+            user = getattr(update, "effective_user", None)
+            user_id = user.id if user else None
+
+            # После начала остановки новые обновления не обрабатываем,
+            # но запоминаем их, чтобы записать в лог
+            if not self.accepting:
+                self.dropped.append((getattr(update, "update_id", None), user_id))
+                return
+
+            # Профилировщик включается командой /profile во время работы
+            token = None
+            if self.profiler and self.profiler.enabled:
+                token = self.profiler.begin(handler)
+            started = time.perf_counter()
+
+            # Задача копирует контекст при создании: все записи лога
+            # внутри обработчика получат user_id и handler
+            user_token = current_user_id.set(user_id)
+            handler_token = current_handler.set(handler)
+            try:
+                task = asyncio.create_task(callback(update, context))
+            finally:
+                current_user_id.reset(user_token)
+                current_handler.reset(handler_token)
+
+            self.in_flight.add(task)
+            try:
+                await asyncio.wait({task})
+            finally:
+                self.in_flight.discard(task)
+                duration = time.perf_counter() - started
+                if token:
+                    self.profiler.end(token, duration)
+
+            context_fields = {"user_id": user_id, "handler": handler, "duration_ms": round(duration * 1000, 1)}
+
+            if task.cancelled():
+                logger.warning("Обработчик отменён", extra=context_fields)
+                return
+
+            error = task.exception()
+            if error is None:
+                level = logging.WARNING if duration >= SLOW_UPDATE else logging.DEBUG
+                logger.log(level, "Обновление обработано", extra=context_fields)
+                return task.result()
+
+            if isinstance(error, ApplicationHandlerStop):
+                raise error
+
+            logger.error("Ошибка в обработчике", exc_info=error, extra=context_fields)
+
+        return wrapper
 
     def run(self):
         """
         Запуск бота.
         """
-        print("Бот запускается")
+        logger.info("Бот запускается")
+
+        asyncio.run(self.serve())
+
+    async def serve(self):
+        """
+        Запускаем опрос Telegram и ждём сигнала остановки.
+        """
+        self.stop_event = asyncio.Event()
+
+        # SIGINT (Ctrl+C) и SIGTERM запускают аккуратную остановку
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self.stop)
+            except NotImplementedError:
+                pass  # Windows - остаётся KeyboardInterrupt
+
+        try:
+            await self.application.initialize()
+            await self.application.start()
+
+            # Запускаем бота в режиме опроса (polling)
+            await self.application.updater.start_polling(allowed_updates=None)
+
+            # Продолжаем рассылку, если бот был остановлен посреди неё
+            if self.handlers.broadcaster:
+                self.handlers.broadcaster.resume(self.application.bot)
 
-        # Запускаем бота в режиме опроса (polling)
-        self.application.run_polling(allowed_updates=None)
+            await self.stop_event.wait()
+        finally:
+            await self.shutdown()
 
     def stop(self):
         """
         Остановка бота.
-        Закрываем соединение с базой данных.
+        Просим бота завершиться - сама остановка идёт в shutdown().
         """
-        print("\n🛑 Останавливаю бота...")
-        self.db.close()
\ No newline at end of file
+        logger.info("Останавливаю бота")
+        if self.stop_event:
+            self.stop_event.set()
+
+    async def shutdown(self):
+        """
+        Аккуратная остановка:
+        1. перестаём получать обновления из Telegram;
+        2. дообрабатываем полученные обновления (не дольше shutdown_timeout);
+        3. сохраняем несохранённые записи и делаем checkpoint WAL;
+        4. закрываем соединения.
+        """
+        loop = asyncio.get_running_loop()
+
+        # 1. Больше не забираем обновления из Telegram
+        if self.application.updater.running:
+            await self.application.updater.stop()
+
+        # 2. Ждём, пока очередь обновлений опустеет и обработчики завершатся
+        deadline = loop.time() + self.shutdown_timeout
+        while self.in_flight or not self.application.update_queue.empty():
+            if loop.time() >= deadline:
+                break
+            await asyncio.sleep(0.1)
+
+        # Всё, что не успело - отменяем
+        self.accepting = False
+        if not self.application.update_queue.empty():
+            logger.warning(
+                "Не дождались обработки очереди: %d обновлений будет пропущено",
+                self.application.update_queue.qsize()
+            )
+        if self.in_flight:
+            logger.warning("Не дождались обработчиков: %d, отменяем", len(self.in_flight))
+            for task in self.in_flight:
+                task.cancel()
+            await asyncio.wait(set(self.in_flight))
+
+        # Рассылка сохраняет прогресс порциями и продолжится после запуска
+        if self.handlers.broadcaster:
+            await self.handlers.broadcaster.stop()
+
+        # Незаконченную резервную копию прерываем - поток копирования не должен пережить бота
+        if self.backup:
+            await self.backup.stop()
+
+        # Application.stop() ждёт задачи JobQueue - просим их закончиться
+        for job in (self.maintenance, self.reminders):
+            if job:
+                job.stop()
+
+        if self.application.running:
+            await self.application.stop()
+
+        # Telegram уже считает эти обновления доставленными - оставляем след в логе
+        if self.dropped:
+            logger.warning(
+                "Пропущено обновлений при остановке: %d (update_id, user_id): %s",
+                len(self.dropped), self.dropped
+            )
+
+        # 3. Сохраняем данные
+        if self.profiler and self.profiler.enabled:
+            self.profiler.disable()
+        self.db.flush()
+        self.db.checkpoint()
+
+        # 4. Закрываем соединения
+        await self.application.shutdown()
+        self.db.close()
@@ -0,0 +1,213 @@
+"""
+Рассылка сообщений всем пользователям
+"""
+
+import asyncio
+import logging
+
+from telegram.error import BadRequest, Forbidden, NetworkError, RetryAfter, TelegramError
+
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """
+    Ограничитель частоты отправки сообщений.
+
+    Telegram ограничивает частоту сообщений для всего бота,
+    поэтому все отправки идут через один общий ограничитель.
+    """
+
+    def __init__(self, rate=25):
+        """
+        Параметры:
+        rate - сколько сообщений в секунду можно отправить
+        """
+        self.interval = 1 / rate
+        self.next_time = 0
+        self.lock = asyncio.Lock()
+
+    async def wait(self):
+        """Ждём, пока можно отправить следующее сообщение"""
+        async with self.lock:
+            loop = asyncio.get_running_loop()
+            now = loop.time()
+            if self.next_time > now:
+                await asyncio.sleep(self.next_time - now)
+            self.next_time = max(now, self.next_time) + self.interval
+
+    def pause(self, seconds):
+        """Приостанавливаем все отправки (после RetryAfter от Telegram)"""
+        now = asyncio.get_running_loop().time()
+        self.next_time = max(self.next_time, now + seconds)
+
+
+class Broadcaster:
+    """
+    Рассылка сообщения всем пользователям из таблицы users.
+
+    Пользователи читаются порциями по id (keyset-пагинация),
+    внутри порции сообщения уходят параллельно, но не больше
+    concurrency одновременно и не чаще, чем позволяет RateLimiter.
+    После каждой порции прогресс сохраняется в broadcasts, поэтому
+    после перезапуска рассылка продолжается с места остановки
+    (повторно может уйти только последняя незавершённая порция).
+    """
+
+    def __init__(self, db, limiter=None, concurrency=10, batch_size=100, max_attempts=3):
+        """
+        Параметры:
+        db - объект базы данных
+        limiter - общий RateLimiter (по умолчанию создаётся свой)
+        concurrency - сколько сообщений отправлять одновременно
+        batch_size - сколько пользователей в одной порции
+        max_attempts - сколько раз пробовать отправить одно сообщение
+        """
+        self.db = db
+        self.limiter = limiter or RateLimiter()
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+
+        # Задача текущей рассылки
+        self.task = None
+
+    def is_running(self):
+        """Идёт ли сейчас рассылка"""
+        return self.task is not None and not self.task.done()
+
+    def start(self, bot, broadcast_id):
+        """
+        Запускаем рассылку в фоне.
+
+        Параметры:
+        bot - объект telegram.Bot
+        broadcast_id - ID рассылки из таблицы broadcasts
+        """
+        self.task = asyncio.create_task(self.run(bot, broadcast_id))
+
+    def resume(self, bot):
+        """
+        Продолжаем рассылку, прерванную перезапуском бота.
+        """
+        broadcast = self.db.get_running_broadcast()
+        if broadcast and not self.is_running():
+            logger.info("Продолжаю рассылку #%s с пользователя %s", broadcast['id'], broadcast['last_user_id'])
+            self.start(bot, broadcast['id'])
+
+    async def stop(self):
+        """
+        Останавливаем рассылку (при остановке бота).
+        Прогресс уже сохранён, рассылка продолжится после запуска.
+        """
+        if self.is_running():
+            self.task.cancel()
+            await asyncio.wait({self.task})
+
+    def cancel(self, broadcast_id):
+        """
+        Отменяем рассылку по команде администратора.
+        """
+        if self.is_running():
+            self.task.cancel()
+        self.db.finish_broadcast(broadcast_id, "cancelled")
+
+    async def run(self, bot, broadcast_id):
+        """
+        Отправляем рассылку порциями до конца таблицы users.
+        """
+        broadcast = self.db.get_broadcast(broadcast_id)
+        last_user_id = broadcast['last_user_id']
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def send_limited(telegram_id):
+            async with semaphore:
+                return await self.send(bot, telegram_id, broadcast['text'])
+
+        try:
+            while True:
+                users = self.db.get_users_after(last_user_id, self.batch_size)
+                if not users:
+                    break
+
+                results = await asyncio.gather(
+                    *(send_limited(telegram_id) for _, telegram_id in users)
+                )
+
+                last_user_id = users[-1][0]
+                self.db.save_broadcast_progress(
+                    broadcast_id,
+                    last_user_id,
+                    results.count("delivered"),
+                    results.count("blocked"),
+                    results.count("failed")
+                )
+
+            self.db.finish_broadcast(broadcast_id)
+
+        except Exception:
+            # Без этого строка осталась бы в статусе running навсегда
+            # и новую рассылку нельзя было бы запустить
+            logger.exception("Ошибка при рассылке #%s", broadcast_id)
+            try:
+                self.db.finish_broadcast(broadcast_id, "failed")
+            except Exception:
+                logger.exception("Не удалось отметить рассылку #%s как прерванную", broadcast_id)
+                return
+
+        # Отчёт администратору, который запустил рассылку
+        broadcast = self.db.get_broadcast(broadcast_id)
+        if broadcast['created_by']:
+            try:
+                await bot.send_message(chat_id=broadcast['created_by'], text=self.format_report(broadcast))
+            except Exception:
+                logger.exception("Не удалось отправить отчёт о рассылке")
+
+    async def send(self, bot, telegram_id, text):
+        """
+        Отправляем одно сообщение с повторами.
+
+        Возвращает:
+        delivered - доставлено, blocked - пользователь заблокировал бота
+        или удалил чат, failed - не удалось отправить
+        """
+        for attempt in range(self.max_attempts):
+            await self.limiter.wait()
+            try:
+                await bot.send_message(chat_id=telegram_id, text=text)
+                return "delivered"
+
+            except RetryAfter as e:
+                # Telegram просит подождать - ждут все отправки, не только эта
+                self.limiter.pause(e.retry_after)
+
+            except Forbidden:
+                return "blocked"
+
+            except BadRequest as e:
+                if "chat not found" in str(e).lower():
+                    return "blocked"
+                return "failed"
+
+            except NetworkError:
+                # Сетевая ошибка или таймаут - пробуем ещё раз чуть позже
+                await asyncio.sleep(attempt + 1)
+
+            except TelegramError:
+                # Остальные ошибки Telegram не должны прерывать всю рассылку
+                logger.warning("Не удалось отправить сообщение %s", telegram_id, exc_info=True)
+                return "failed"
+
+        return "failed"
+
+    @staticmethod
+    def format_report(broadcast):
+        """Отчёт о рассылке в виде текста"""
+        statuses = {"running": "идёт", "done": "завершена", "cancelled": "отменена", "failed": "прервана из-за ошибки"}
+        return (
+            f"📣 Рассылка #{broadcast['id']}: {statuses.get(broadcast['status'], broadcast['status'])}\n\n"
+            f"✅ Доставлено: {broadcast['delivered']}\n"
+            f"🚫 Заблокировали бота: {broadcast['blocked']}\n"
+            f"❌ Ошибки: {broadcast['failed']}"
+        )
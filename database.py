@@ -2,26 +2,108 @@
 Работа с базой данных SQLite
 """
 
+import argparse
+import datetime
+import logging
+import os
+import random
+import re
 import sqlite3
-
+from urllib.parse import quote
+
+from dictionary import DictionaryPack, MMAP_SIZE
+from fuzzy import delete_variants, max_typos, typo_distance
+from reminders import DEFAULT_OFFSET, local_date
+
+
+logger = logging.getLogger(__name__)
+
+# Какая доля вопросов (не меньше) задаётся по личным словам, если они есть.
+# Иначе в большом пакете личные слова почти не попадались бы.
+PERSONAL_SHARE = 0.5
+
+# Сколько правильных ответов нужно, чтобы слово считалось выученным.
+# Значение вшито в триггеры user_stats: после изменения нужен rebuild-stats
+# и пересоздание триггеров.
+MASTERED_THRESHOLD = 10
+
+# Счётчики user_stats, которые можно заново посчитать по таблицам слов.
+# Ответы по удалённым строкам (обслуживание, пересборка пакета) берутся
+# из pruned_* - их в таблицах слов уже нет.
+EXPECTED_STATS_SQL = f'''
+    SELECT u.id AS user_id,
+        (SELECT COUNT(*) FROM user_words uw
+         WHERE uw.user_id = u.id AND uw.is_active = 1) AS personal_words,
+        (SELECT COUNT(*) FROM user_pack_words upw
+         WHERE upw.user_id = u.id AND upw.is_active = 0) AS hidden_pack_words,
+        (SELECT COUNT(*) FROM user_words uw
+         WHERE uw.user_id = u.id AND uw.is_active = 1
+           AND uw.correct_answers >= {MASTERED_THRESHOLD})
+        + (SELECT COUNT(*) FROM user_pack_words upw
+           WHERE upw.user_id = u.id AND upw.is_active = 1
+             AND upw.correct_answers >= {MASTERED_THRESHOLD}) AS mastered_words,
+        (SELECT COALESCE(SUM(uw.correct_answers), 0) FROM user_words uw WHERE uw.user_id = u.id)
+        + (SELECT COALESCE(SUM(upw.correct_answers), 0) FROM user_pack_words upw
+           WHERE upw.user_id = u.id)
+        + COALESCE((SELECT s.pruned_correct_answers FROM user_stats s
+                    WHERE s.user_id = u.id), 0) AS correct_answers,
+        (SELECT COALESCE(SUM(uw.wrong_answers), 0) FROM user_words uw WHERE uw.user_id = u.id)
+        + (SELECT COALESCE(SUM(upw.wrong_answers), 0) FROM user_pack_words upw
+           WHERE upw.user_id = u.id)
+        + COALESCE((SELECT s.pruned_wrong_answers FROM user_stats s
+                    WHERE s.user_id = u.id), 0) AS wrong_answers
+    FROM users u
+'''
 
 
 class Database:
     """
     Класс для работы с базой данных.
     Использует SQLite
+
+    Общие слова хранятся не в таблице words, а в словаре-пакете
+    (см. dictionary.py), который подключается через ATTACH как "pack".
+    Наружу слова из пакета отдаются с отрицательным id: -1, -2, ...
+    Так их можно отличить от личных слов пользователя.
     """
 
-    def __init__(self, db_name="english_words.db"):
+    def __init__(self, db_name="english_words.db", pack_path="dictionary_pack.db"):
         """
         Инициализация базы данных.
+
+        Параметры:
+        db_name - файл базы данных
+        pack_path - файл словаря-пакета с общими словами
         """
-        self.connection = sqlite3.connect(db_name)
+        self.db_name = db_name
+        self.connection = sqlite3.connect(f"file:{quote(db_name)}", uri=True)
         self.cursor = self.connection.cursor()
+        self.closed = False
+
+        # Освобождённые страницы возвращаются понемногу (PRAGMA incremental_vacuum).
+        # Действует только для новой базы - старую нужно один раз перевести:
+        # python database.py enable-incremental-vacuum
+        self.cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+
+        # WAL: чтение не блокирует запись, а checkpoint делается при остановке
+        self.cursor.execute("PRAGMA journal_mode = WAL")
+        self.attach_pack(pack_path)
         self.create_tables()
-        self.add_common_words()
+        self.migrate_common_words()
+        self.sync_pack()
+
+        # Статистика - после переноса старых общих слов и пересборки пакета:
+        # иначе перенесённые ответы посчитались бы дважды (сначала при заполнении
+        # user_stats по старым строкам, потом триггером на user_pack_words)
+        self.create_stats_table()
+
+        if not self.is_incremental_vacuum():
+            logger.warning(
+                "База создана без auto_vacuum = INCREMENTAL, файл не будет уменьшаться - "
+                "остановите бота и выполните: python database.py enable-incremental-vacuum"
+            )
 
-        print(f"База данных подключена: {db_name}")
+        logger.info("База данных подключена: %s", db_name)
 
     def create_tables(self):
         """
@@ -35,10 +117,29 @@ class Database:
                 telegram_id INTEGER UNIQUE NOT NULL,
                 username TEXT,
                 first_name TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                reminder_hour INTEGER,
+                reminder_offset INTEGER,
+                next_reminder_at INTEGER
             )
         ''')
 
+        # Напоминания: час по местному времени, смещение от UTC в минутах
+        # и момент следующего напоминания (unix-время). В старых базах
+        # этих колонок нет - добавляем.
+        self.cursor.execute("PRAGMA table_info(users)")
+        user_columns = {row[1] for row in self.cursor.fetchall()}
+        for column in ("reminder_hour", "reminder_offset", "next_reminder_at"):
+            if column not in user_columns:
+                self.cursor.execute(f"ALTER TABLE users ADD COLUMN {column} INTEGER")
+
+        # Частичный индекс: в нём только пользователи с включёнными напоминаниями,
+        # поэтому поиск тех, кому пора напомнить, не просматривает всю таблицу
+        self.cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_users_next_reminder ON users(next_reminder_at)
+            WHERE next_reminder_at IS NOT NULL
+        ''')
+
         # Таблица слов
         self.cursor.execute('''
             CREATE TABLE IF NOT EXISTS words (
@@ -60,49 +161,444 @@ class Database:
                 correct_answers INTEGER DEFAULT 0,
                 wrong_answers INTEGER DEFAULT 0, 
                 is_active BOOLEAN DEFAULT 1,
+                deactivated_at TIMESTAMP,
                 FOREIGN KEY (user_id) REFERENCES users(id),
                 FOREIGN KEY (word_id) REFERENCES words(id),
                 UNIQUE(user_id, word_id)
             )
         ''')
 
+        # Когда слово убрали из уроков: обслуживание удаляет такие строки
+        # (вместе с историей ответов) только через несколько дней.
+        # В старых базах колонки нет - уже убранным словам отсчёт идёт с сегодняшнего дня.
+        self.cursor.execute("PRAGMA table_info(user_words)")
+        if "deactivated_at" not in {row[1] for row in self.cursor.fetchall()}:
+            self.cursor.execute("ALTER TABLE user_words ADD COLUMN deactivated_at TIMESTAMP")
+            self.cursor.execute(
+                "UPDATE user_words SET deactivated_at = CURRENT_TIMESTAMP WHERE is_active = 0"
+            )
+
+        # Частичный индекс для обслуживания: в нём только убранные из уроков слова,
+        # поэтому поиск устаревших не просматривает всю user_words
+        self.cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_user_words_deactivated ON user_words(deactivated_at)
+            WHERE is_active = 0
+        ''')
+
+        self.create_fuzzy_table()
+
+        # Полнотекстовый индекс по личным словам для /find.
+        # Хранит только токены - сами слова лежат в words (content='words').
+        # created_by индексируется, чтобы искать только среди слов автора.
+        self.cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'words_fts'")
+        fts_exists = self.cursor.fetchone() is not None
+
+        self.cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS words_fts USING fts5(
+                english, russian, created_by,
+                content='words', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2',
+                prefix='2 3'
+            )
+        ''')
+
+        # Триггеры держат индекс в актуальном состоянии
+        self.cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS words_fts_insert AFTER INSERT ON words BEGIN
+                INSERT INTO words_fts (rowid, english, russian, created_by)
+                VALUES (new.id, new.english, new.russian, new.created_by);
+            END
+        ''')
+        self.cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS words_fts_delete AFTER DELETE ON words BEGIN
+                INSERT INTO words_fts (words_fts, rowid, english, russian, created_by)
+                VALUES ('delete', old.id, old.english, old.russian, old.created_by);
+            END
+        ''')
+        self.cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS words_fts_update AFTER UPDATE ON words BEGIN
+                INSERT INTO words_fts (words_fts, rowid, english, russian, created_by)
+                VALUES ('delete', old.id, old.english, old.russian, old.created_by);
+                INSERT INTO words_fts (rowid, english, russian, created_by)
+                VALUES (new.id, new.english, new.russian, new.created_by);
+            END
+        ''')
+
+        # Индекс только что создан - заполняем его уже существующими словами
+        if not fts_exists:
+            self.cursor.execute("INSERT INTO words_fts (words_fts) VALUES ('rebuild')")
+
+        # Индекс для поиска слов, на которые больше никто не ссылается
+        self.cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_user_words_word_id ON user_words(word_id)"
+        )
+
+        # Прогресс по словам из пакета.
+        # Строка появляется только если слово скрыто или на него отвечали,
+        # поэтому новый пользователь не копирует себе весь пакет.
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS user_pack_words (
+                user_id INTEGER NOT NULL,
+                word_id INTEGER NOT NULL,
+                correct_answers INTEGER DEFAULT 0,
+                wrong_answers INTEGER DEFAULT 0,
+                is_active BOOLEAN DEFAULT 1,
+                FOREIGN KEY (user_id) REFERENCES users(id),
+                PRIMARY KEY (user_id, word_id)
+            )
+        ''')
+
+        # Какое слово стоит за id пакета, на который есть прогресс.
+        # id в пакете - просто номер строки, после пересборки он может
+        # указывать на другое слово; по этой таблице прогресс переносится.
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS pack_words_seen (
+                word_id INTEGER PRIMARY KEY,
+                english TEXT NOT NULL,
+                russian TEXT NOT NULL
+            )
+        ''')
+
+        # Служебные значения (версия подключённого пакета и т.п.)
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS settings (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            )
+        ''')
+
+        # Рассылки администратора и их прогресс.
+        # last_user_id - все пользователи с id <= last_user_id уже обработаны.
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS broadcasts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                text TEXT NOT NULL,
+                created_by INTEGER,
+                status TEXT NOT NULL DEFAULT 'running',
+                last_user_id INTEGER NOT NULL DEFAULT 0,
+                delivered INTEGER NOT NULL DEFAULT 0,
+                blocked INTEGER NOT NULL DEFAULT 0,
+                failed INTEGER NOT NULL DEFAULT 0,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                finished_at TIMESTAMP
+            )
+        ''')
+
         self.connection.commit()
 
-    def add_common_words(self):
-        """
-        Добавляем общие слова для всех пользователей.
-        """
-
-        common_words = [
-            ("red", "красный"),
-            ("blue", "синий"),
-            ("green", "зелёный"),
-            ("yellow", "жёлтый"),
-            ("black", "чёрный"),
-            ("white", "белый"),
-            ("I", "я"),
-            ("you", "ты"),
-            ("he", "он"),
-            ("she", "она"),
-            ("it", "оно"),
-            ("we", "мы"),
-            ("they", "они")
-        ]
-
-        # Проверяем, есть ли уже общие слова
-        self.cursor.execute("SELECT COUNT(*) FROM words WHERE is_common = 1")
-        count = self.cursor.fetchone()[0]
-
-        # Если общих слов нет - добавляем
-        if count == 0:
-            for english, russian in common_words:
+    def create_fuzzy_table(self):
+        """
+        Таблица word_deletes - ключи для поиска личных слов с опечатками
+        (см. fuzzy.delete_variants), как deletes в словаре-пакете.
+
+        Ключи хранятся только для активных слов: при удалении слова из уроков
+        их убирает триггер. Поиск - это несколько обращений по первичному
+        ключу, поэтому не зависит от числа слов и не держит индекс в памяти.
+        """
+        self.cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'word_deletes'")
+        table_exists = self.cursor.fetchone() is not None
+
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS word_deletes (
+                variant TEXT NOT NULL,
+                user_id INTEGER NOT NULL,
+                word_id INTEGER NOT NULL,
+                PRIMARY KEY (variant, user_id, word_id)
+            ) WITHOUT ROWID
+        ''')
+        # Для удаления ключей слова триггерами
+        self.cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_word_deletes_word_id ON word_deletes(word_id)"
+        )
+
+        for name, event, condition in (
+            ("deactivate", "UPDATE OF is_active", "old.is_active = 1 AND new.is_active = 0"),
+            ("delete", "DELETE", "old.is_active = 1"),
+        ):
+            self.cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS user_words_fuzzy_{name} AFTER {event} ON user_words
+                WHEN {condition} BEGIN
+                    DELETE FROM word_deletes WHERE word_id = old.word_id AND user_id = old.user_id;
+                END
+            ''')
+
+        # Таблица только что создана - заполняем по уже существующим личным словам
+        if not table_exists:
+            self.cursor.execute('''
+                SELECT uw.user_id, w.id, w.english
+                FROM user_words uw
+                JOIN words w ON w.id = uw.word_id
+                WHERE uw.is_active = 1 AND w.is_common = 0
+            ''')
+            self.cursor.executemany(
+                "INSERT OR IGNORE INTO word_deletes (variant, user_id, word_id) VALUES (?, ?, ?)",
+                [
+                    (variant, user_id, word_id)
+                    for user_id, word_id, english in self.cursor.fetchall()
+                    for variant in delete_variants(english.lower())
+                ]
+            )
+
+    def create_stats_table(self):
+        """
+        Таблица user_stats со счётчиками прогресса пользователя.
+
+        Счётчики слов обновляют триггеры на user_words и user_pack_words,
+        поэтому /stats читает одну строку по первичному ключу.
+        Серию дней (streak) обновляет record_answer.
+
+        correct_answers и wrong_answers - история ответов: при удалении
+        строк (обслуживание базы) они не уменьшаются, а ответы удалённых
+        строк копятся в pruned_correct_answers и pruned_wrong_answers,
+        чтобы check_user_stats мог сверить счётчики с таблицами точно.
+        """
+        self.cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'user_stats'")
+        stats_exists = self.cursor.fetchone() is not None
+
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS user_stats (
+                user_id INTEGER PRIMARY KEY,
+                personal_words INTEGER NOT NULL DEFAULT 0,
+                hidden_pack_words INTEGER NOT NULL DEFAULT 0,
+                mastered_words INTEGER NOT NULL DEFAULT 0,
+                correct_answers INTEGER NOT NULL DEFAULT 0,
+                wrong_answers INTEGER NOT NULL DEFAULT 0,
+                streak_days INTEGER NOT NULL DEFAULT 0,
+                last_practice_date TEXT,
+                pruned_correct_answers INTEGER NOT NULL DEFAULT 0,
+                pruned_wrong_answers INTEGER NOT NULL DEFAULT 0,
+                FOREIGN KEY (user_id) REFERENCES users(id)
+            )
+        ''')
+
+        # В старых базах колонок pruned_* нет - добавляем с нулями
+        # и пересоздаём триггеры удаления, которые их не заполняли
+        self.cursor.execute("PRAGMA table_info(user_stats)")
+        stats_columns = {row[1] for row in self.cursor.fetchall()}
+        if "pruned_correct_answers" not in stats_columns:
+            for column in ("pruned_correct_answers", "pruned_wrong_answers"):
                 self.cursor.execute(
-                    "INSERT INTO words (english, russian, is_common) VALUES (?, ?, 1)",
-                    (english, russian)
+                    f"ALTER TABLE user_stats ADD COLUMN {column} INTEGER NOT NULL DEFAULT 0"
                 )
+            self.cursor.execute("DROP TRIGGER IF EXISTS user_words_stats_delete")
+            self.cursor.execute("DROP TRIGGER IF EXISTS user_pack_words_stats_delete")
+
+        # Для каждой таблицы: какой счётчик слов она ведёт и какие строки в него входят.
+        # Строку user_stats создаём через NOT EXISTS, а не INSERT OR IGNORE:
+        # внутри upsert (ON CONFLICT DO UPDATE) OR IGNORE в триггере не действует.
+        for table, words_column, words_value in (
+            ("user_words", "personal_words", "{row}.is_active = 1"),
+            ("user_pack_words", "hidden_pack_words", "{row}.is_active = 0"),
+        ):
+            new_words = words_value.format(row="new")
+            old_words = words_value.format(row="old")
+            new_mastered = f"(new.is_active = 1 AND new.correct_answers >= {MASTERED_THRESHOLD})"
+            old_mastered = f"(old.is_active = 1 AND old.correct_answers >= {MASTERED_THRESHOLD})"
+
+            self.cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS {table}_stats_insert AFTER INSERT ON {table} BEGIN
+                    INSERT INTO user_stats (user_id) SELECT new.user_id
+                    WHERE NOT EXISTS (SELECT 1 FROM user_stats WHERE user_id = new.user_id);
+                    UPDATE user_stats SET
+                        {words_column} = {words_column} + ({new_words}),
+                        mastered_words = mastered_words + {new_mastered},
+                        correct_answers = correct_answers + new.correct_answers,
+                        wrong_answers = wrong_answers + new.wrong_answers
+                    WHERE user_id = new.user_id;
+                END
+            ''')
+            self.cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS {table}_stats_update
+                AFTER UPDATE OF is_active, correct_answers, wrong_answers ON {table} BEGIN
+                    INSERT INTO user_stats (user_id) SELECT new.user_id
+                    WHERE NOT EXISTS (SELECT 1 FROM user_stats WHERE user_id = new.user_id);
+                    UPDATE user_stats SET
+                        {words_column} = {words_column} + ({new_words}) - ({old_words}),
+                        mastered_words = mastered_words + {new_mastered} - {old_mastered},
+                        correct_answers = correct_answers + new.correct_answers - old.correct_answers,
+                        wrong_answers = wrong_answers + new.wrong_answers - old.wrong_answers
+                    WHERE user_id = new.user_id;
+                END
+            ''')
+            self.cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS {table}_stats_delete AFTER DELETE ON {table} BEGIN
+                    UPDATE user_stats SET
+                        {words_column} = {words_column} - ({old_words}),
+                        mastered_words = mastered_words - {old_mastered},
+                        pruned_correct_answers = pruned_correct_answers + old.correct_answers,
+                        pruned_wrong_answers = pruned_wrong_answers + old.wrong_answers
+                    WHERE user_id = old.user_id;
+                END
+            ''')
+
+        # Таблица только что создана - заполняем по уже существующим данным
+        if not stats_exists:
+            self.rebuild_user_stats()
+
+    def attach_pack(self, pack_path):
+        """
+        Подключаем словарь-пакет с общими словами.
 
-            self.connection.commit()
-            print(f"✅ Добавлено {len(common_words)} общих слов")
+        Пакет открывается только на чтение и отображается в память,
+        поэтому время запуска не зависит от размера пакета.
+        """
+        self.pack = DictionaryPack(pack_path)
+        self.pack.ensure_exists()
+
+        self.cursor.execute("ATTACH DATABASE ? AS pack", (self.pack.uri(),))
+        self.cursor.execute(f"PRAGMA pack.mmap_size = {MMAP_SIZE}")
+
+        # Количество слов в пакете хранится в meta, считать строки не нужно
+        self.cursor.execute("SELECT value FROM pack.meta WHERE key = 'word_count'")
+        self.pack_size = int(self.cursor.fetchone()[0])
+
+        # Версия пакета: по ней sync_pack() замечает пересборку.
+        # В старых пакетах версии нет - считаем по словам.
+        self.cursor.execute("SELECT value FROM pack.meta WHERE key = 'version'")
+        row = self.cursor.fetchone()
+        if row:
+            self.pack_version = row[0]
+        else:
+            self.cursor.execute("SELECT id, english, russian FROM pack.words ORDER BY id")
+            self.pack_version = DictionaryPack.version(self.cursor.fetchall())
+
+        # В старых пакетах нет индекса для поиска с опечатками
+        self.cursor.execute("SELECT 1 FROM pack.sqlite_master WHERE name = 'deletes'")
+        self.pack_has_fuzzy = self.cursor.fetchone() is not None
+        if not self.pack_has_fuzzy:
+            logger.warning("В словаре нет индекса опечаток - пересоберите его: python dictionary.py")
+
+        self.cursor.execute("SELECT 1 FROM pack.sqlite_master WHERE name = 'words_fts'")
+        self.pack_has_fts = self.cursor.fetchone() is not None
+        if not self.pack_has_fts:
+            logger.warning("В словаре нет индекса для /find - пересоберите его: python dictionary.py")
+
+        logger.info("Словарь подключен: %s (%d слов)", pack_path, self.pack_size)
+
+    def migrate_common_words(self):
+        """
+        Переносим общие слова из старой схемы.
+
+        Раньше общие слова лежали в words (is_common = 1) и копировались
+        каждому пользователю в user_words. Теперь они живут в пакете,
+        а в user_pack_words переносится только непустой прогресс.
+        """
+        self.cursor.execute("SELECT 1 FROM words WHERE is_common = 1 LIMIT 1")
+        if not self.cursor.fetchone():
+            return
+
+        self.cursor.execute('''
+            INSERT OR IGNORE INTO user_pack_words
+                (user_id, word_id, correct_answers, wrong_answers, is_active)
+            SELECT uw.user_id, p.id, uw.correct_answers, uw.wrong_answers, uw.is_active
+            FROM user_words uw
+            JOIN words w ON w.id = uw.word_id
+            JOIN pack.words p ON p.id = (
+                SELECT id FROM pack.words WHERE english = w.english LIMIT 1
+            )
+            WHERE w.is_common = 1
+              AND (uw.is_active = 0 OR uw.correct_answers > 0 OR uw.wrong_answers > 0)
+        ''')
+        migrated = self.cursor.rowcount
+
+        self.cursor.execute(
+            "DELETE FROM user_words WHERE word_id IN (SELECT id FROM words WHERE is_common = 1)"
+        )
+        self.cursor.execute("DELETE FROM words WHERE is_common = 1")
+
+        self.connection.commit()
+        logger.info("Общие слова перенесены в словарь (прогресс: %d)", migrated)
+
+    def sync_pack(self):
+        """
+        Сверяем версию пакета с той, с которой работали раньше.
+
+        Если пакет пересобрали (добавили тему, поменяли порядок CSV,
+        убрали дубликат), id слов могли сдвинуться. Тогда прогресс и
+        скрытые слова переносятся на новые id по паре (english, russian),
+        а прогресс по словам, которых в пакете больше нет, удаляется.
+        """
+        self.cursor.execute("SELECT value FROM settings WHERE key = 'pack_version'")
+        row = self.cursor.fetchone()
+        stored_version = row[0] if row else None
+
+        if stored_version == self.pack_version:
+            return
+
+        if stored_version is not None:
+            self.remap_pack_progress()
+
+        # Запоминаем слова нового пакета, на которые уже есть прогресс
+        self.cursor.execute("DELETE FROM pack_words_seen")
+        self.cursor.execute('''
+            INSERT INTO pack_words_seen (word_id, english, russian)
+            SELECT p.id, p.english, p.russian
+            FROM pack.words p
+            WHERE p.id IN (SELECT DISTINCT word_id FROM user_pack_words)
+        ''')
+        self.cursor.execute(
+            "INSERT OR REPLACE INTO settings (key, value) VALUES ('pack_version', ?)",
+            (self.pack_version,)
+        )
+        self.connection.commit()
+
+    def remap_pack_progress(self):
+        """
+        Переносим user_pack_words на id нового пакета (см. sync_pack).
+        """
+        self.cursor.execute("DROP TABLE IF EXISTS temp.pack_remap")
+        self.cursor.execute('''
+            CREATE TEMP TABLE pack_remap AS
+            SELECT s.word_id AS old_id,
+                   (SELECT p.id FROM pack.words p
+                    WHERE p.english = s.english AND p.russian = s.russian
+                    LIMIT 1) AS new_id
+            FROM pack_words_seen s
+        ''')
+
+        # Слова, которых в пакете больше нет
+        self.cursor.execute('''
+            DELETE FROM user_pack_words
+            WHERE word_id IN (SELECT old_id FROM pack_remap WHERE new_id IS NULL)
+        ''')
+        lost = self.cursor.rowcount
+
+        # Сначала ставим новые id со знаком минус, чтобы по дороге
+        # не столкнуться с ещё не перенесённой строкой
+        self.cursor.execute('''
+            UPDATE user_pack_words
+            SET word_id = -(SELECT new_id FROM pack_remap WHERE old_id = user_pack_words.word_id)
+            WHERE word_id IN (SELECT old_id FROM pack_remap WHERE new_id != old_id)
+        ''')
+        moved = self.cursor.rowcount
+        self.cursor.execute("UPDATE user_pack_words SET word_id = -word_id WHERE word_id < 0")
+
+        self.cursor.execute("DROP TABLE temp.pack_remap")
+        logger.warning(
+            "Словарь пересобран: прогресс перенесён для %d строк, удалён для %d (слов больше нет в словаре)",
+            moved, lost
+        )
+
+    def remember_pack_words(self, pack_ids):
+        """
+        Запоминаем, какие слова стоят за id пакета (см. pack_words_seen).
+        Вызывается, когда на слово пакета появляется прогресс.
+        """
+        self.cursor.executemany('''
+            INSERT OR IGNORE INTO pack_words_seen (word_id, english, russian)
+            SELECT id, english, russian FROM pack.words WHERE id = ?
+        ''', [(pack_id,) for pack_id in pack_ids])
+
+    def get_user_id(self, telegram_id):
+        """
+        Получаем ID пользователя в нашей базе по telegram_id.
+
+        Возвращает:
+        ID пользователя или None
+        """
+        self.cursor.execute("SELECT id FROM users WHERE telegram_id = ?", (telegram_id,))
+        user = self.cursor.fetchone()
+        return user[0] if user else None
 
     def add_user(self, telegram_id, username, first_name):
         """
@@ -124,29 +620,11 @@ class Database:
             )
             self.connection.commit()
 
-            # Получаем ID пользователя
-            self.cursor.execute("SELECT id FROM users WHERE telegram_id = ?", (telegram_id,))
-            user_id = self.cursor.fetchone()[0]
-
-            # Добавляем все общие слова для этого пользователя
-            self.cursor.execute("SELECT id FROM words WHERE is_common = 1")
-            common_words = self.cursor.fetchall()
-
-            for word in common_words:
-                word_id = word[0]
-                try:
-                    self.cursor.execute(
-                        "INSERT OR IGNORE INTO user_words (user_id, word_id) VALUES (?, ?)",
-                        (user_id, word_id)
-                    )
-                except:
-                    pass  # Если уже есть - пропускаем
+            # Общие слова копировать не нужно - они берутся из пакета
+            return self.get_user_id(telegram_id)
 
-            self.connection.commit()
-            return user_id
-
-        except Exception as e:
-            print(f"❌ Ошибка при добавлении пользователя: {e}")
+        except Exception:
+            logger.exception("Ошибка при добавлении пользователя")
             return None
 
     def add_personal_word(self, telegram_id, english, russian):
@@ -169,11 +647,21 @@ class Database:
                 return False
 
             user_id = user[0]
+            english, russian = english.lower(), russian.lower()
+
+            # Такое же слово с тем же переводом уже есть - второй раз не добавляем
+            self.cursor.execute('''
+                SELECT 1 FROM word_deletes d
+                JOIN words w ON w.id = d.word_id
+                WHERE d.variant = ? AND d.user_id = ? AND w.english = ? AND w.russian = ?
+            ''', (english, user_id, english, russian))
+            if self.cursor.fetchone():
+                return False
 
             # Добавляем слово (персональное, is_common = 0)
             self.cursor.execute(
                 "INSERT INTO words (english, russian, is_common, created_by) VALUES (?, ?, 0, ?)",
-                (english.lower(), russian.lower(), user_id)
+                (english, russian, user_id)
             )
             word_id = self.cursor.lastrowid
 
@@ -183,17 +671,175 @@ class Database:
                 (user_id, word_id)
             )
 
+            # Ключи для поиска с опечатками
+            self.cursor.executemany(
+                "INSERT OR IGNORE INTO word_deletes (variant, user_id, word_id) VALUES (?, ?, ?)",
+                [(variant, user_id, word_id) for variant in delete_variants(english)]
+            )
+
             self.connection.commit()
             return True
 
-        except Exception as e:
-            print(f"❌ Ошибка при добавлении слова: {e}")
+        except Exception:
+            logger.exception("Ошибка при добавлении слова")
             return False
 
+    def find_similar_words(self, telegram_id, english):
+        """
+        Ищем среди активных слов пользователя (личных и из пакета)
+        слова, совпадающие с english или отличающиеся одной опечаткой.
+
+        Личные слова ищутся по word_deletes, слова из пакета - по таблице
+        ключей внутри пакета: у двух слов с одной опечаткой есть общий ключ.
+
+        Параметры:
+        telegram_id
+        english - английское слово
+
+        Возвращает:
+        Список словарей {id, english, russian, distance}, ближайшие первыми
+        """
+        try:
+            user_id = self.get_user_id(telegram_id)
+
+            if not user_id:
+                return []
+
+            english = english.strip().lower()
+            variants = list(delete_variants(english))
+            placeholders = ", ".join("?" * len(variants))
+
+            # Личные слова (ключи есть только у активных)
+            self.cursor.execute(f'''
+                SELECT DISTINCT w.id, w.english, w.russian
+                FROM word_deletes d
+                JOIN words w ON w.id = d.word_id
+                WHERE d.variant IN ({placeholders}) AND d.user_id = ?
+            ''', variants + [user_id])
+            candidates = self.cursor.fetchall()
+
+            # Слова из пакета, которые пользователь не скрыл
+            if self.pack_has_fuzzy:
+                self.cursor.execute(f'''
+                    SELECT DISTINCT p.id, p.english, p.russian
+                    FROM pack.deletes d
+                    JOIN pack.words p ON p.id = d.word_id
+                    WHERE d.variant IN ({placeholders})
+                      AND NOT EXISTS (
+                          SELECT 1 FROM user_pack_words upw
+                          WHERE upw.user_id = ? AND upw.word_id = p.id AND upw.is_active = 0
+                      )
+                ''', variants + [user_id])
+                candidates += [(-pack_id, word_english, russian)
+                               for pack_id, word_english, russian in self.cursor.fetchall()]
+
+            results = []
+            for word_id, word_english, russian in candidates:
+                word = word_english.lower()
+                limit = min(max_typos(english), max_typos(word))
+                distance = typo_distance(english, word, limit)
+                if distance <= limit:
+                    results.append({
+                        "id": word_id, "english": word_english,
+                        "russian": russian, "distance": distance
+                    })
+
+            results.sort(key=lambda word: (word["distance"], word["english"]))
+            return results
+
+        except Exception:
+            logger.exception("Ошибка при поиске похожих слов")
+            return []
+
+    @staticmethod
+    def make_fts_query(text):
+        """
+        Превращаем текст пользователя в запрос FTS5.
+
+        Каждое слово ищется по началу ("сло"*), все слова должны найтись.
+        Кавычки защищают от синтаксиса FTS5 в тексте пользователя.
+        "ё" и "е" считаем одной буквой.
+
+        Возвращает:
+        Строку запроса или None, если искать нечего
+        """
+        tokens = re.findall(r"\w+", text.lower())
+        if not tokens:
+            return None
+
+        terms = []
+        for token in tokens:
+            variants = {token, token.replace("ё", "е"), token.replace("е", "ё")}
+            terms.append("(" + " OR ".join(f'"{variant}"*' for variant in sorted(variants)) + ")")
+
+        return " AND ".join(terms)
+
+    def find_words(self, telegram_id, text, limit=20):
+        """
+        Ищем слова пользователя по началу английского или русского слова.
+
+        Личные слова ищутся в words_fts только среди слов автора,
+        общие - в полнотекстовом индексе пакета.
+
+        Параметры:
+        telegram_id
+        text - что искать
+        limit - сколько слов вернуть
+
+        Возвращает:
+        Список кортежей (id, english, russian)
+        """
+        try:
+            user_id = self.get_user_id(telegram_id)
+            query = self.make_fts_query(text)
+
+            if not user_id or not query:
+                return []
+
+            # Личные слова: только созданные пользователем и не удалённые.
+            # Слова ищем только в english/russian - иначе "/find 1" совпадёт
+            # с created_by и вернёт все слова пользователя
+            self.cursor.execute('''
+                SELECT w.id, w.english, w.russian
+                FROM words_fts f
+                JOIN words w ON w.id = f.rowid
+                JOIN user_words uw ON uw.word_id = w.id AND uw.user_id = ?
+                WHERE words_fts MATCH ? AND uw.is_active = 1
+                ORDER BY f.rank
+                LIMIT ?
+            ''', (user_id, f"created_by : {user_id} AND {{english russian}} : ({query})", limit))
+            results = self.cursor.fetchall()
+
+            # Общие слова из пакета, которые пользователь не скрыл
+            if self.pack_has_fts and len(results) < limit:
+                self.cursor.execute('''
+                    SELECT p.id, p.english, p.russian
+                    FROM pack.words_fts f
+                    JOIN pack.words p ON p.id = f.rowid
+                    WHERE f.words_fts MATCH ?
+                      AND NOT EXISTS (
+                          SELECT 1 FROM user_pack_words upw
+                          WHERE upw.user_id = ? AND upw.word_id = p.id AND upw.is_active = 0
+                      )
+                    ORDER BY f.rank
+                    LIMIT ?
+                ''', (query, user_id, limit - len(results)))
+                results += [(-pack_id, english, russian) for pack_id, english, russian in self.cursor.fetchall()]
+
+            return results
+
+        except Exception:
+            logger.exception("Ошибка при поиске слов")
+            return []
+
     def get_random_word(self, telegram_id):
         """
         Получаем случайное слово для пользователя.
 
+        Если у пользователя есть личные слова, не меньше PERSONAL_SHARE
+        вопросов задаётся по ним, остальные - по не скрытым словам пакета
+        (без ORDER BY RANDOM() по пакету).
+
         Параметры:
         telegram_id
 
@@ -201,25 +847,43 @@ class Database:
         Словарь с информацией о слове или None
         """
         try:
-            self.cursor.execute("SELECT id FROM users WHERE telegram_id = ?", (telegram_id,))
-            user = self.cursor.fetchone()
+            user_id = self.get_user_id(telegram_id)
 
-            if not user:
+            if not user_id:
                 return None
 
-            user_id = user[0]
+            # Сколько личных слов и сколько слов пакета пользователь скрыл
+            self.cursor.execute(
+                "SELECT COUNT(*) FROM user_words WHERE user_id = ? AND is_active = 1",
+                (user_id,)
+            )
+            personal_count = self.cursor.fetchone()[0]
 
-            # Ищем активное слово для пользователя (случайное)
-            self.cursor.execute('''
-                SELECT w.id, w.english, w.russian 
-                FROM words w
-                JOIN user_words uw ON w.id = uw.word_id
-                WHERE uw.user_id = ? AND uw.is_active = 1
-                ORDER BY RANDOM()
-                LIMIT 1
-            ''', (user_id,))
+            self.cursor.execute(
+                "SELECT COUNT(*) FROM user_pack_words WHERE user_id = ? AND is_active = 0",
+                (user_id,)
+            )
+            pack_count = self.pack_size - self.cursor.fetchone()[0]
 
-            word = self.cursor.fetchone()
+            if personal_count + pack_count <= 0:
+                return None
+
+            personal_share = max(PERSONAL_SHARE, personal_count / (personal_count + pack_count))
+
+            if personal_count and (pack_count <= 0 or random.random() < personal_share):
+                # Личное слово
+                index = random.randrange(personal_count)
+                self.cursor.execute('''
+                    SELECT w.id, w.english, w.russian 
+                    FROM words w
+                    JOIN user_words uw ON w.id = uw.word_id
+                    WHERE uw.user_id = ? AND uw.is_active = 1
+                    LIMIT 1 OFFSET ?
+                ''', (user_id, index))
+                word = self.cursor.fetchone()
+            else:
+                # Слово из пакета
+                word = self.get_random_pack_word(user_id)
 
             if word:
                 return {
@@ -230,14 +894,58 @@ class Database:
 
             return None
 
-        except Exception as e:
-            print(f"❌ Ошибка при получении слова: {e}")
+        except Exception:
+            logger.exception("Ошибка при получении слова")
             return None
 
+    def get_random_pack_word(self, user_id, attempts=10):
+        """
+        Случайное слово из пакета, которое пользователь не скрыл.
+
+        Берём случайный id и проверяем, что слово не скрыто.
+        Если пользователь скрыл почти весь пакет - выбираем запросом.
+
+        Возвращает:
+        Кортеж (id, english, russian) с отрицательным id или None
+        """
+        for _ in range(attempts):
+            pack_id = random.randint(1, self.pack_size)
+
+            self.cursor.execute(
+                "SELECT 1 FROM user_pack_words WHERE user_id = ? AND word_id = ? AND is_active = 0",
+                (user_id, pack_id)
+            )
+            if self.cursor.fetchone():
+                continue
+
+            self.cursor.execute(
+                "SELECT id, english, russian FROM pack.words WHERE id = ?",
+                (pack_id,)
+            )
+            word = self.cursor.fetchone()
+            if word:
+                return (-word[0], word[1], word[2])
+
+        self.cursor.execute('''
+            SELECT p.id, p.english, p.russian
+            FROM pack.words p
+            WHERE NOT EXISTS (
+                SELECT 1 FROM user_pack_words upw
+                WHERE upw.user_id = ? AND upw.word_id = p.id AND upw.is_active = 0
+            )
+            ORDER BY RANDOM()
+            LIMIT 1
+        ''', (user_id,))
+        word = self.cursor.fetchone()
+        return (-word[0], word[1], word[2]) if word else None
+
     def get_wrong_answers(self, correct_word_id, limit=3):
         """
         Получаем неправильные варианты ответов.
 
+        Варианты берутся из пакета по случайным id,
+        поэтому запрос не зависит от размера пакета.
+
         Параметры:
         correct_word_id - ID правильного слова
         limit - сколько неправильных вариантов нужно
@@ -246,26 +954,38 @@ class Database:
         Список английских слов (неправильные варианты)
         """
         try:
-            self.cursor.execute('''
-                SELECT english FROM words 
-                WHERE id != ? AND is_common = 1 
-                ORDER BY RANDOM() 
-                LIMIT ?
-            ''', (correct_word_id, limit))
+            # Берём на один id больше - вдруг попадётся правильное слово
+            sample_size = min(limit + 1, self.pack_size)
+            pack_ids = random.sample(range(1, self.pack_size + 1), sample_size)
+            pack_ids = [pack_id for pack_id in pack_ids if -pack_id != correct_word_id][:limit]
+
+            if not pack_ids:
+                return []
+
+            placeholders = ", ".join("?" * len(pack_ids))
+            self.cursor.execute(
+                f"SELECT english FROM pack.words WHERE id IN ({placeholders})",
+                pack_ids
+            )
 
             wrong_words = self.cursor.fetchall()
             return [word[0] for word in wrong_words]
 
-        except Exception as e:
-            print(f"❌ Ошибка при получении неправильных ответов: {e}")
+        except Exception:
+            logger.exception("Ошибка при получении неправильных ответов")
             return []
 
-    def get_user_words(self, telegram_id):
+    def get_user_words(self, telegram_id, limit=None, offset=0, include_pack=False):
         """
-        Получаем все активные слова пользователя.
+        Получаем все активные личные слова пользователя.
+        Весь пакет сюда не входит - в нём может быть очень много слов.
 
         Параметры:
         telegram_id
+        limit - сколько слов вернуть (None - все)
+        offset - сколько слов пропустить (для постраничного вывода)
+        include_pack - добавить после личных слова пакета, которые уже
+                       встречались пользователю в уроках (id со знаком минус)
 
         Возвращает:
         Список кортежей (id, english, russian)
@@ -279,21 +999,133 @@ class Database:
 
             user_id = user[0]
 
+            if include_pack:
+                self.cursor.execute('''
+                    SELECT id, english, russian FROM (
+                        SELECT w.id, w.english, w.russian, 0 AS from_pack
+                        FROM words w
+                        JOIN user_words uw ON w.id = uw.word_id
+                        WHERE uw.user_id = ? AND uw.is_active = 1
+                        UNION ALL
+                        SELECT -p.id, p.english, p.russian, 1 AS from_pack
+                        FROM user_pack_words upw
+                        JOIN pack.words p ON p.id = upw.word_id
+                        WHERE upw.user_id = ? AND upw.is_active = 1
+                    )
+                    ORDER BY from_pack, russian, id
+                    LIMIT ? OFFSET ?
+                ''', (user_id, user_id, -1 if limit is None else limit, offset))
+                return self.cursor.fetchall()
+
             # Получаем все активные слова пользователя
             self.cursor.execute('''
                 SELECT w.id, w.english, w.russian 
                 FROM words w
                 JOIN user_words uw ON w.id = uw.word_id
                 WHERE uw.user_id = ? AND uw.is_active = 1
-                ORDER BY w.russian
-            ''', (user_id,))
+                ORDER BY w.russian, w.id
+                LIMIT ? OFFSET ?
+            ''', (user_id, -1 if limit is None else limit, offset))
 
             return self.cursor.fetchall()
 
-        except Exception as e:
-            print(f"❌ Ошибка при получении слов пользователя: {e}")
+        except Exception:
+            logger.exception("Ошибка при получении слов пользователя")
             return []
 
+    def count_user_words(self, telegram_id, include_pack=False):
+        """
+        Считаем активные личные слова пользователя
+        (include_pack - как в get_user_words).
+
+        Возвращает:
+        Количество слов
+        """
+        try:
+            user_id = self.get_user_id(telegram_id)
+
+            if not user_id:
+                return 0
+
+            self.cursor.execute(
+                "SELECT COUNT(*) FROM user_words WHERE user_id = ? AND is_active = 1",
+                (user_id,)
+            )
+            count = self.cursor.fetchone()[0]
+
+            if include_pack:
+                self.cursor.execute(
+                    "SELECT COUNT(*) FROM user_pack_words WHERE user_id = ? AND is_active = 1",
+                    (user_id,)
+                )
+                count += self.cursor.fetchone()[0]
+
+            return count
+
+        except Exception:
+            logger.exception("Ошибка при подсчёте слов пользователя")
+            return 0
+
+    def record_answer(self, telegram_id, word_id, is_correct):
+        """
+        Записываем ответ пользователя на слово.
+
+        Параметры:
+        telegram_id
+        word_id - ID слова (отрицательный - слово из пакета)
+        is_correct - правильный ли ответ
+
+        Возвращает:
+        True - если успешно, False - если ошибка
+        """
+        try:
+            user_id = self.get_user_id(telegram_id)
+
+            if not user_id:
+                return False
+
+            correct, wrong = (1, 0) if is_correct else (0, 1)
+
+            if word_id < 0:
+                self.cursor.execute('''
+                    INSERT INTO user_pack_words (user_id, word_id, correct_answers, wrong_answers)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT(user_id, word_id) DO UPDATE SET
+                        correct_answers = correct_answers + excluded.correct_answers,
+                        wrong_answers = wrong_answers + excluded.wrong_answers
+                ''', (user_id, -word_id, correct, wrong))
+                self.remember_pack_words([-word_id])
+            else:
+                self.cursor.execute('''
+                    UPDATE user_words
+                    SET correct_answers = correct_answers + ?, wrong_answers = wrong_answers + ?
+                    WHERE user_id = ? AND word_id = ?
+                ''', (correct, wrong, user_id, word_id))
+
+            # Серия дней подряд с ответами. Дата - по времени пользователя,
+            # как и в напоминаниях, иначе урок поздно вечером засчитался бы завтрашним
+            self.cursor.execute("SELECT reminder_offset FROM users WHERE id = ?", (user_id,))
+            today = local_date(self.cursor.fetchone()[0])
+            yesterday = today - datetime.timedelta(days=1)
+            self.cursor.execute("INSERT OR IGNORE INTO user_stats (user_id) VALUES (?)", (user_id,))
+            self.cursor.execute('''
+                UPDATE user_stats SET
+                    streak_days = CASE
+                        WHEN last_practice_date = ? THEN streak_days
+                        WHEN last_practice_date = ? THEN streak_days + 1
+                        ELSE 1
+                    END,
+                    last_practice_date = ?
+                WHERE user_id = ?
+            ''', (today.isoformat(), yesterday.isoformat(), today.isoformat(), user_id))
+
+            self.connection.commit()
+            return True
+
+        except Exception:
+            logger.exception("Ошибка при записи ответа")
+            return False
+
     def deactivate_word(self, telegram_id, word_id):
         """
         Деактивируем слово для пользователя (удаляем из обучения).
@@ -301,34 +1133,604 @@ class Database:
         Параметры:
 
         telegram_id
-        word_id
+        word_id - ID слова (отрицательный - слово из пакета)
 
         Возвращает:
         True - если успешно, False - если ошибка
         """
+        return self.deactivate_words(telegram_id, [word_id]) is not None
+
+    def deactivate_words(self, telegram_id, word_ids):
+        """
+        Деактивируем сразу несколько слов одной транзакцией.
+
+        Параметры:
+        telegram_id
+        word_ids - список ID слов (отрицательные - слова из пакета)
+
+        Возвращает:
+        Количество деактивированных слов или None при ошибке
+        """
         try:
-            self.cursor.execute("SELECT id FROM users WHERE telegram_id = ?", (telegram_id,))
-            user = self.cursor.fetchone()
+            user_id = self.get_user_id(telegram_id)
 
-            if not user:
-                return False
+            if not user_id:
+                return None
 
-            user_id = user[0]
+            personal = [(user_id, word_id) for word_id in word_ids if word_id > 0]
+            pack = [(user_id, -word_id) for word_id in word_ids if word_id < 0]
 
-            # Деактивируем слово
-            self.cursor.execute(
-                "UPDATE user_words SET is_active = 0 WHERE user_id = ? AND word_id = ?",
-                (user_id, word_id)
+            # Деактивируем личные слова
+            self.cursor.executemany(
+                '''
+                UPDATE user_words SET is_active = 0, deactivated_at = CURRENT_TIMESTAMP
+                WHERE user_id = ? AND word_id = ? AND is_active = 1
+                ''',
+                personal
             )
+            count = max(self.cursor.rowcount, 0)
+
+            # Слова из пакета - запоминаем, что пользователь их скрыл
+            self.cursor.executemany('''
+                INSERT INTO user_pack_words (user_id, word_id, is_active) VALUES (?, ?, 0)
+                ON CONFLICT(user_id, word_id) DO UPDATE SET is_active = 0
+            ''', pack)
+            self.remember_pack_words([word_id for _, word_id in pack])
+            count += len(pack)
 
             self.connection.commit()
-            return True
+            return count
+
+        except Exception:
+            self.connection.rollback()
+            logger.exception("Ошибка при удалении слов")
+            return None
+
+    def deactivate_learned_words(self, telegram_id, min_correct=MASTERED_THRESHOLD):
+        """
+        Деактивируем все слова, на которые пользователь
+        ответил правильно не меньше min_correct раз.
+
+        Параметры:
+        telegram_id
+        min_correct - сколько правильных ответов считается "выучено"
+
+        Возвращает:
+        Количество деактивированных слов или None при ошибке
+        """
+        try:
+            user_id = self.get_user_id(telegram_id)
+
+            if not user_id:
+                return None
+
+            self.cursor.execute('''
+                UPDATE user_words SET is_active = 0, deactivated_at = CURRENT_TIMESTAMP
+                WHERE user_id = ? AND is_active = 1 AND correct_answers >= ?
+            ''', (user_id, min_correct))
+            count = self.cursor.rowcount
+
+            self.cursor.execute('''
+                UPDATE user_pack_words SET is_active = 0
+                WHERE user_id = ? AND is_active = 1 AND correct_answers >= ?
+            ''', (user_id, min_correct))
+            count += self.cursor.rowcount
+
+            self.connection.commit()
+            return count
+
+        except Exception:
+            self.connection.rollback()
+            logger.exception("Ошибка при удалении выученных слов")
+            return None
+
+    def get_user_stats(self, telegram_id):
+        """
+        Получаем прогресс пользователя одним чтением user_stats.
+
+        Возвращает:
+        Словарь со статистикой или None
+        """
+        try:
+            self.cursor.execute('''
+                SELECT s.personal_words, s.hidden_pack_words, s.mastered_words,
+                       s.correct_answers, s.wrong_answers, s.streak_days, s.last_practice_date,
+                       u.reminder_offset
+                FROM users u
+                LEFT JOIN user_stats s ON s.user_id = u.id
+                WHERE u.telegram_id = ?
+            ''', (telegram_id,))
+            row = self.cursor.fetchone()
+
+            if not row:
+                return None
+
+            # LEFT JOIN: у нового пользователя строки статистики ещё нет
+            (personal_words, hidden_pack_words, mastered_words,
+             correct_answers, wrong_answers, streak_days) = (value or 0 for value in row[:6])
+            last_practice_date = row[6]
+
+            # Серия прервана, если вчера и сегодня (по времени пользователя) ответов не было
+            yesterday = (local_date(row[7]) - datetime.timedelta(days=1)).isoformat()
+            if not last_practice_date or last_practice_date < yesterday:
+                streak_days = 0
+
+            answers = correct_answers + wrong_answers
+            return {
+                "total_words": personal_words + self.pack_size - hidden_pack_words,
+                "personal_words": personal_words,
+                "mastered_words": mastered_words,
+                "correct_answers": correct_answers,
+                "wrong_answers": wrong_answers,
+                "accuracy": correct_answers / answers if answers else 0,
+                "streak_days": streak_days
+            }
+
+        except Exception:
+            logger.exception("Ошибка при получении статистики")
+            return None
+
+    def check_user_stats(self):
+        """
+        Проверяем, что счётчики user_stats совпадают с таблицами слов.
+
+        Ответы сверяются с учётом удалённых строк (pruned_*), поэтому
+        лишние ответы в счётчиках - тоже расхождение.
+
+        Возвращает:
+        Список ID пользователей с расхождениями
+        """
+        self.cursor.execute(f'''
+            SELECT e.user_id
+            FROM ({EXPECTED_STATS_SQL}) e
+            LEFT JOIN user_stats s ON s.user_id = e.user_id
+            WHERE COALESCE(s.personal_words, 0) != e.personal_words
+               OR COALESCE(s.hidden_pack_words, 0) != e.hidden_pack_words
+               OR COALESCE(s.mastered_words, 0) != e.mastered_words
+               OR COALESCE(s.correct_answers, 0) != e.correct_answers
+               OR COALESCE(s.wrong_answers, 0) != e.wrong_answers
+        ''')
+        return [row[0] for row in self.cursor.fetchall()]
+
+    def rebuild_user_stats(self):
+        """
+        Пересчитываем счётчики user_stats по таблицам слов
+        (и ответам удалённых строк). Серия дней сохраняется.
+
+        Возвращает:
+        Сколько пользователей пересчитано
+        """
+        self.cursor.execute(f'''
+            INSERT INTO user_stats
+                (user_id, personal_words, hidden_pack_words, mastered_words,
+                 correct_answers, wrong_answers)
+            SELECT user_id, personal_words, hidden_pack_words, mastered_words,
+                   correct_answers, wrong_answers
+            FROM ({EXPECTED_STATS_SQL}) WHERE true
+            ON CONFLICT(user_id) DO UPDATE SET
+                personal_words = excluded.personal_words,
+                hidden_pack_words = excluded.hidden_pack_words,
+                mastered_words = excluded.mastered_words,
+                correct_answers = excluded.correct_answers,
+                wrong_answers = excluded.wrong_answers
+        ''')
+        count = self.cursor.rowcount
+        self.connection.commit()
+        return count
+
+    def create_broadcast(self, text, created_by):
+        """
+        Создаём рассылку.
+
+        Параметры:
+        text - текст сообщения
+        created_by - telegram_id администратора
 
-        except Exception as e:
-            print(f"❌ Ошибка при удалении слова: {e}")
+        Возвращает:
+        ID рассылки
+        """
+        self.cursor.execute(
+            "INSERT INTO broadcasts (text, created_by) VALUES (?, ?)",
+            (text, created_by)
+        )
+        self.connection.commit()
+        return self.cursor.lastrowid
+
+    def get_broadcast(self, broadcast_id=None):
+        """
+        Получаем рассылку по ID (или последнюю, если ID не указан).
+
+        Возвращает:
+        Словарь с рассылкой или None
+        """
+        if broadcast_id is None:
+            self.cursor.execute("SELECT * FROM broadcasts ORDER BY id DESC LIMIT 1")
+        else:
+            self.cursor.execute("SELECT * FROM broadcasts WHERE id = ?", (broadcast_id,))
+
+        row = self.cursor.fetchone()
+        if not row:
+            return None
+
+        columns = [column[0] for column in self.cursor.description]
+        return dict(zip(columns, row))
+
+    def get_running_broadcast(self):
+        """
+        Незавершённая рассылка (например, прерванная перезапуском бота).
+
+        Возвращает:
+        Словарь с рассылкой или None
+        """
+        self.cursor.execute("SELECT id FROM broadcasts WHERE status = 'running' ORDER BY id LIMIT 1")
+        row = self.cursor.fetchone()
+        return self.get_broadcast(row[0]) if row else None
+
+    def get_users_after(self, last_user_id, limit):
+        """
+        Следующая порция пользователей по возрастанию id (keyset-пагинация):
+        запрос идёт по первичному ключу и не замедляется к концу таблицы.
+
+        Возвращает:
+        Список кортежей (id, telegram_id)
+        """
+        self.cursor.execute(
+            "SELECT id, telegram_id FROM users WHERE id > ? ORDER BY id LIMIT ?",
+            (last_user_id, limit)
+        )
+        return self.cursor.fetchall()
+
+    def save_broadcast_progress(self, broadcast_id, last_user_id, delivered, blocked, failed):
+        """
+        Сохраняем прогресс рассылки после очередной порции.
+        Счётчики прибавляются к уже сохранённым.
+        """
+        self.cursor.execute('''
+            UPDATE broadcasts SET
+                last_user_id = ?,
+                delivered = delivered + ?,
+                blocked = blocked + ?,
+                failed = failed + ?
+            WHERE id = ?
+        ''', (last_user_id, delivered, blocked, failed, broadcast_id))
+        self.connection.commit()
+
+    def finish_broadcast(self, broadcast_id, status="done"):
+        """
+        Отмечаем рассылку завершённой.
+
+        Параметры:
+        status - done, cancelled или failed
+        """
+        self.cursor.execute(
+            "UPDATE broadcasts SET status = ?, finished_at = CURRENT_TIMESTAMP WHERE id = ?",
+            (status, broadcast_id)
+        )
+        self.connection.commit()
+
+    def set_reminder(self, telegram_id, hour, offset, next_at):
+        """
+        Включаем ежедневное напоминание.
+
+        Параметры:
+        telegram_id
+        hour - час по местному времени пользователя (0-23)
+        offset - смещение местного времени от UTC в минутах
+        next_at - когда напомнить в первый раз (unix-время)
+
+        Возвращает:
+        True - если успешно, False - если пользователя нет
+        """
+        self.cursor.execute('''
+            UPDATE users SET reminder_hour = ?, reminder_offset = ?, next_reminder_at = ?
+            WHERE telegram_id = ?
+        ''', (hour, offset, next_at, telegram_id))
+        self.connection.commit()
+        return self.cursor.rowcount > 0
+
+    def disable_reminder(self, telegram_id):
+        """
+        Выключаем напоминание.
+
+        Возвращает:
+        True - если напоминание было включено
+        """
+        self.cursor.execute('''
+            UPDATE users SET reminder_hour = NULL, reminder_offset = NULL, next_reminder_at = NULL
+            WHERE telegram_id = ? AND next_reminder_at IS NOT NULL
+        ''', (telegram_id,))
+        self.connection.commit()
+        return self.cursor.rowcount > 0
+
+    def get_reminder(self, telegram_id):
+        """
+        Настройки напоминания пользователя.
+
+        Возвращает:
+        Словарь {hour, offset, next_at} или None, если напоминание выключено
+        """
+        self.cursor.execute('''
+            SELECT reminder_hour, reminder_offset, next_reminder_at FROM users
+            WHERE telegram_id = ? AND next_reminder_at IS NOT NULL
+        ''', (telegram_id,))
+        row = self.cursor.fetchone()
+        if not row:
+            return None
+        return {"hour": row[0], "offset": row[1], "next_at": row[2]}
+
+    def claim_due_reminders(self, now, limit):
+        """
+        Забираем порцию пользователей, которым пора напомнить.
+
+        Запрос идёт по частичному индексу idx_users_next_reminder и читает
+        только наступившие напоминания. В той же транзакции next_reminder_at
+        сдвигается на следующий день (если бот был выключен несколько дней -
+        сразу на ближайший будущий), поэтому повторный вызов вернёт
+        следующую порцию, а после перезапуска напоминание не уйдёт дважды.
+
+        Параметры:
+        now - текущее unix-время
+        limit - размер порции
+
+        Возвращает:
+        Список кортежей (telegram_id, practiced_today)
+        """
+        # "Сегодня" - по местному времени пользователя, в том же смещении,
+        # в котором record_answer записывает last_practice_date
+        self.cursor.execute('''
+            SELECT u.id, u.telegram_id,
+                   COALESCE(s.last_practice_date
+                            = date(? + COALESCE(u.reminder_offset, ?) * 60, 'unixepoch'), 0)
+            FROM users u
+            LEFT JOIN user_stats s ON s.user_id = u.id
+            WHERE u.next_reminder_at <= ?
+            ORDER BY u.next_reminder_at
+            LIMIT ?
+        ''', (now, DEFAULT_OFFSET, now, limit))
+        rows = self.cursor.fetchall()
+
+        self.cursor.executemany('''
+            UPDATE users
+            SET next_reminder_at = next_reminder_at + ((? - next_reminder_at) / 86400 + 1) * 86400
+            WHERE id = ?
+        ''', [(now, user_id) for user_id, _, _ in rows])
+        self.connection.commit()
+
+        return [(telegram_id, bool(practiced)) for _, telegram_id, practiced in rows]
+
+    def reset_reminders(self, telegram_ids, next_at):
+        """
+        Возвращаем напоминания, которые забрали, но не успели отправить
+        (бот останавливается): они уйдут после запуска.
+        """
+        self.cursor.executemany(
+            "UPDATE users SET next_reminder_at = ? WHERE telegram_id = ? AND next_reminder_at IS NOT NULL",
+            [(next_at, telegram_id) for telegram_id in telegram_ids]
+        )
+        self.connection.commit()
+
+    def flush(self):
+        """Сохраняем незакрытую транзакцию, если она есть"""
+        if not self.closed and self.connection.in_transaction:
+            self.connection.commit()
+
+    def checkpoint(self, mode="TRUNCATE"):
+        """
+        Переносим WAL в основной файл базы.
+
+        Параметры:
+        mode - режим checkpoint (PASSIVE, FULL, RESTART, TRUNCATE)
+
+        Возвращает:
+        True - если успешно, False - если ошибка
+        """
+        if self.closed:
+            return False
+
+        try:
+            self.cursor.execute(f"PRAGMA wal_checkpoint({mode})")
+            busy, log_pages, checkpointed = self.cursor.fetchone()
+            logger.info("WAL checkpoint: %d/%d страниц", checkpointed, log_pages)
+            return busy == 0
+
+        except Exception:
+            logger.exception("Ошибка при checkpoint WAL")
             return False
 
+    def get_wal_size(self):
+        """Размер файла WAL в байтах (0, если его нет)"""
+        try:
+            return os.path.getsize(self.db_name + "-wal")
+        except OSError:
+            return 0
+
+    def analyze(self, analysis_limit=1000):
+        """
+        Обновляем статистику для планировщика запросов.
+
+        analysis_limit ограничивает число просматриваемых строк
+        на индекс, поэтому ANALYZE не зависит от размера таблиц.
+        """
+        self.cursor.execute(f"PRAGMA analysis_limit = {int(analysis_limit)}")
+        # Только основная база - пакет открыт на чтение
+        self.cursor.execute("ANALYZE main")
+        self.connection.commit()
+
+    def get_free_pages(self):
+        """
+        Сколько страниц базы свободно и сколько байт в странице.
+
+        Возвращает:
+        Кортеж (free_pages, page_size)
+        """
+        self.cursor.execute("PRAGMA freelist_count")
+        free_pages = self.cursor.fetchone()[0]
+        self.cursor.execute("PRAGMA page_size")
+        page_size = self.cursor.fetchone()[0]
+        return free_pages, page_size
+
+    def is_incremental_vacuum(self):
+        """Включён ли режим auto_vacuum = INCREMENTAL"""
+        self.cursor.execute("PRAGMA auto_vacuum")
+        return self.cursor.fetchone()[0] == 2
+
+    def incremental_vacuum(self, pages):
+        """
+        Возвращаем файловой системе не больше pages свободных страниц.
+
+        Возвращает:
+        Сколько страниц освобождено
+        """
+        before, _ = self.get_free_pages()
+        # execute() делает только один шаг (одна страница),
+        # executescript() выполняет прагму до конца
+        self.cursor.executescript(f"PRAGMA incremental_vacuum({int(pages)});")
+        after, _ = self.get_free_pages()
+        return before - after
+
+    def enable_incremental_vacuum(self):
+        """
+        Переводим существующую базу в auto_vacuum = INCREMENTAL.
+
+        Режим меняется только полной пересборкой файла (VACUUM): она
+        блокирует базу и требует свободного места размером с базу,
+        поэтому выполняется вручную при остановленном боте.
+
+        Возвращает:
+        True - если режим включён
+        """
+        if self.is_incremental_vacuum():
+            return True
+
+        self.flush()
+        self.cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        self.cursor.execute("VACUUM")
+        return self.is_incremental_vacuum()
+
+    # Функции очистки ниже вызываются порциями из maintenance.py.
+    # Каждая порция читает не больше limit строк (а не только удаляет),
+    # чтобы ни один вызов не блокировал цикл событий надолго.
+    # Принимают курсор after и возвращают (удалено, курсор для следующей
+    # порции или None, если таблица пройдена до конца).
+
+    def prune_inactive_user_words(self, limit, after=None, min_age_days=30):
+        """
+        Удаляем порцию связей пользователь-слово,
+        убранных из уроков больше min_age_days дней назад.
+
+        Курсор не нужен (after не используется): частичный индекс
+        idx_user_words_deactivated отдаёт только убранные слова,
+        начиная с самых старых.
+
+        Возвращает:
+        (удалено, 0 - есть ещё, None - подходящих строк больше нет)
+        """
+        self.cursor.execute('''
+            DELETE FROM user_words WHERE id IN (
+                SELECT id FROM user_words INDEXED BY idx_user_words_deactivated
+                WHERE is_active = 0 AND deactivated_at <= datetime('now', ?)
+                ORDER BY deactivated_at
+                LIMIT ?
+            )
+        ''', (f"-{int(min_age_days)} days", limit))
+        removed = self.cursor.rowcount
+        self.connection.commit()
+        return removed, (0 if removed == limit else None)
+
+    def prune_empty_pack_progress(self, limit, after=None):
+        """
+        Удаляем строки user_pack_words, которые ничего не хранят:
+        слово не скрыто и ответов на него не было.
+        Просматривается не больше limit строк после rowid = after.
+
+        Возвращает:
+        (удалено, курсор или None)
+        """
+        return self.prune_range(
+            "user_pack_words", "rowid", after, limit,
+            "is_active = 1 AND correct_answers = 0 AND wrong_answers = 0"
+        )
+
+    def prune_orphan_words(self, limit, after=None):
+        """
+        Удаляем личные слова, которые не связаны ни с одним пользователем.
+        Просматривается не больше limit слов после id = after.
+
+        Возвращает:
+        (удалено, курсор или None)
+        """
+        return self.prune_range(
+            "words", "id", after, limit,
+            "NOT EXISTS (SELECT 1 FROM user_words uw WHERE uw.word_id = words.id)"
+        )
+
+    def prune_range(self, table, key, after, limit, condition):
+        """
+        Удаляем строки, подходящие под condition, среди следующих limit строк
+        таблицы по ключу key (keyset-пагинация).
+
+        Возвращает:
+        (удалено, последний просмотренный ключ или None, если строк не осталось)
+        """
+        after = after or 0
+        self.cursor.execute(
+            f"SELECT MAX({key}) FROM (SELECT {key} FROM {table} WHERE {key} > ? ORDER BY {key} LIMIT ?)",
+            (after, limit)
+        )
+        last = self.cursor.fetchone()[0]
+        if last is None:
+            return 0, None
+
+        self.cursor.execute(
+            f"DELETE FROM {table} WHERE {key} > ? AND {key} <= ? AND {condition}",
+            (after, last)
+        )
+        removed = self.cursor.rowcount
+        self.connection.commit()
+        return removed, last
+
     def close(self):
         """Закрываем соединение с базой данных"""
+        if self.closed:
+            return
+
         self.connection.close()
-        print("Соединение с базой данных закрыто")
\ No newline at end of file
+        self.closed = True
+        logger.info("Соединение с базой данных закрыто")
+
+
+def main():
+    """
+    Обслуживание базы из командной строки:
+
+    python database.py check-stats
+    python database.py rebuild-stats
+    python database.py enable-incremental-vacuum  (при остановленном боте)
+    """
+    parser = argparse.ArgumentParser(description="Обслуживание базы данных")
+    parser.add_argument("action", choices=["check-stats", "rebuild-stats", "enable-incremental-vacuum"])
+    parser.add_argument("--db", default="english_words.db", help="файл базы данных")
+    parser.add_argument("--pack", default="dictionary_pack.db", help="файл словаря-пакета")
+    args = parser.parse_args()
+
+    db = Database(args.db, pack_path=args.pack)
+    try:
+        if args.action == "enable-incremental-vacuum":
+            size = os.path.getsize(args.db)
+            if db.enable_incremental_vacuum():
+                print(f"✅ auto_vacuum = INCREMENTAL: {size // 1024} КБ -> {os.path.getsize(args.db) // 1024} КБ")
+            else:
+                print("❌ Не удалось включить auto_vacuum = INCREMENTAL")
+            return
+
+        broken = db.check_user_stats()
+        print(f"Пользователей с расхождениями: {len(broken)}")
+
+        if args.action == "rebuild-stats":
+            print(f"✅ Пересчитано пользователей: {db.rebuild_user_stats()}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
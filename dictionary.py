@@ -0,0 +1,231 @@
+"""
+Словари-пакеты с общими словами
+"""
+
+import argparse
+import csv
+import hashlib
+import logging
+import os
+import sqlite3
+from urllib.parse import quote
+
+from fuzzy import delete_variants
+
+
+logger = logging.getLogger(__name__)
+
+# Встроенные общие слова (цвета и местоимения).
+# Из них собирается пакет по умолчанию, если файла пакета ещё нет.
+DEFAULT_WORDS = [
+    ("red", "красный", "colors"),
+    ("blue", "синий", "colors"),
+    ("green", "зелёный", "colors"),
+    ("yellow", "жёлтый", "colors"),
+    ("black", "чёрный", "colors"),
+    ("white", "белый", "colors"),
+    ("I", "я", "pronouns"),
+    ("you", "ты", "pronouns"),
+    ("he", "он", "pronouns"),
+    ("she", "она", "pronouns"),
+    ("it", "оно", "pronouns"),
+    ("we", "мы", "pronouns"),
+    ("they", "они", "pronouns")
+]
+
+# Сколько байт пакета SQLite может отобразить в память (256 МБ)
+MMAP_SIZE = 256 * 1024 * 1024
+
+
+class DictionaryPack:
+    """
+    Пакет общих слов.
+
+    Это отдельный файл SQLite, который бот открывает только для чтения
+    и отображает в память (mmap). Страницы файла лежат в кэше ОС и
+    общие для всех процессов бота, поэтому слова не копируются ни в
+    каждый процесс, ни в таблицу words.
+
+    Слова в пакете пронумерованы подряд: id от 1 до word_count.
+    Поэтому после пересборки у слова может быть другой id - по версии
+    пакета (meta.version) база замечает это и переносит прогресс
+    пользователей по паре (english, russian), см. Database.sync_pack.
+    """
+
+    def __init__(self, path="dictionary_pack.db"):
+        """
+        Параметры:
+        path - путь к файлу пакета
+        """
+        self.path = path
+
+    def exists(self):
+        """Есть ли файл пакета на диске"""
+        return os.path.exists(self.path)
+
+    def ensure_exists(self):
+        """
+        Если файла пакета нет - собираем пакет из встроенных слов.
+        """
+        if not self.exists():
+            DictionaryPack.build(self.path, DEFAULT_WORDS)
+            logger.info("Создан словарь по умолчанию: %s", self.path)
+
+    def uri(self):
+        """
+        URI для подключения пакета только на чтение.
+
+        immutable=1 говорит SQLite, что файл не меняется,
+        поэтому при чтении не нужны блокировки и журнал.
+        """
+        path = quote(os.path.abspath(self.path))
+        return f"file:{path}?mode=ro&immutable=1"
+
+    @staticmethod
+    def version(rows):
+        """
+        Версия пакета - хэш пар (id, english, russian).
+        Меняется, только если у какого-то id поменялось слово.
+        """
+        digest = hashlib.sha1()
+        for word_id, english, russian, *_ in rows:
+            digest.update(f"{word_id}\t{english}\t{russian}\n".encode("utf-8"))
+        return digest.hexdigest()
+
+    @staticmethod
+    def build(path, words):
+        """
+        Собираем файл пакета.
+
+        Пакет пишется во временный файл и затем атомарно подменяет
+        старый, так что запущенные процессы дочитывают прежнюю версию.
+
+        Параметры:
+        path - куда сохранить пакет
+        words - список кортежей (english, russian, theme)
+
+        Возвращает:
+        Количество слов в пакете
+        """
+        tmp_path = path + ".tmp"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+        connection = sqlite3.connect(tmp_path)
+        cursor = connection.cursor()
+
+        cursor.execute('''
+            CREATE TABLE words (
+                id INTEGER PRIMARY KEY,
+                english TEXT NOT NULL,
+                russian TEXT NOT NULL,
+                theme TEXT
+            )
+        ''')
+        cursor.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+
+        # Нумеруем слова подряд, чтобы случайное слово выбиралось по id
+        count = 0
+        seen = set()
+        rows = []
+        for english, russian, theme in words:
+            english = english.strip()
+            russian = russian.strip().lower()
+            if not english or not russian or (english, russian) in seen:
+                continue
+            seen.add((english, russian))
+            count += 1
+            rows.append((count, english, russian, theme))
+
+        cursor.executemany(
+            "INSERT INTO words (id, english, russian, theme) VALUES (?, ?, ?, ?)",
+            rows
+        )
+        cursor.execute("CREATE INDEX idx_words_english ON words(english)")
+
+        # Ключи для поиска с опечатками (см. fuzzy.delete_variants).
+        # Индекс лежит в том же файле и тоже читается через mmap.
+        cursor.execute('''
+            CREATE TABLE deletes (
+                variant TEXT NOT NULL,
+                word_id INTEGER NOT NULL,
+                PRIMARY KEY (variant, word_id)
+            ) WITHOUT ROWID
+        ''')
+        cursor.executemany(
+            "INSERT OR IGNORE INTO deletes (variant, word_id) VALUES (?, ?)",
+            (
+                (variant, word_id)
+                for word_id, english, _, _ in rows
+                for variant in delete_variants(english.lower())
+            )
+        )
+        # Полнотекстовый индекс для /find (поиск по началу слова)
+        cursor.execute('''
+            CREATE VIRTUAL TABLE words_fts USING fts5(
+                english, russian,
+                content='words', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2',
+                prefix='2 3'
+            )
+        ''')
+        cursor.execute("INSERT INTO words_fts (words_fts) VALUES ('rebuild')")
+
+        cursor.executemany(
+            "INSERT INTO meta (key, value) VALUES (?, ?)",
+            [("word_count", str(count)), ("version", DictionaryPack.version(rows))]
+        )
+
+        connection.commit()
+        cursor.execute("VACUUM")
+        connection.close()
+
+        os.replace(tmp_path, path)
+        return count
+
+    @staticmethod
+    def load_csv(csv_path):
+        """
+        Читаем слова из CSV-файла.
+
+        Формат строки: english,russian[,theme]
+        Если темы нет - темой становится имя файла.
+
+        Возвращает:
+        Список кортежей (english, russian, theme)
+        """
+        default_theme = os.path.splitext(os.path.basename(csv_path))[0]
+        words = []
+
+        with open(csv_path, "r", encoding="utf-8", newline="") as file:
+            for row in csv.reader(file):
+                if len(row) < 2:
+                    continue
+                theme = row[2].strip() if len(row) > 2 and row[2].strip() else default_theme
+                words.append((row[0], row[1], theme))
+
+        return words
+
+
+def main():
+    """
+    Сборка пакета из тематических CSV-файлов:
+
+    python dictionary.py animals.csv food.csv -o dictionary_pack.db
+    """
+    parser = argparse.ArgumentParser(description="Сборка словаря-пакета общих слов")
+    parser.add_argument("csv_files", nargs="*", help="CSV-файлы: english,russian[,theme]")
+    parser.add_argument("-o", "--output", default="dictionary_pack.db", help="файл пакета")
+    parser.add_argument("--with-defaults", action="store_true", help="добавить встроенные слова")
+    args = parser.parse_args()
+
+    words = list(DEFAULT_WORDS) if args.with_defaults or not args.csv_files else []
+    for csv_path in args.csv_files:
+        words.extend(DictionaryPack.load_csv(csv_path))
+
+    count = DictionaryPack.build(args.output, words)
+    print(f"✅ Пакет {args.output} собран: {count} слов")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Поиск слов с опечатками
+"""
+
+
+def max_typos(word):
+    """
+    Сколько опечаток допускаем в слове.
+    В коротких словах опечатка делает из слова другое слово, поэтому 0.
+    """
+    return 1 if len(word) >= 4 else 0
+
+
+def typo_distance(a, b, max_distance=1):
+    """
+    Расстояние между словами: вставки, удаления, замены
+    и перестановки соседних букв (optimal string alignment).
+
+    Считаем только до max_distance: если слова отличаются сильнее,
+    возвращаем max_distance + 1, не досчитывая до конца.
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+
+    previous2 = None
+    previous = list(range(len(b) + 1))
+
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+
+            # Перестановка соседних букв - одна опечатка
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+
+        if min(current) > max_distance:
+            return max_distance + 1
+
+        previous2, previous = previous, current
+
+    return min(previous[-1], max_distance + 1)
+
+
+def delete_variants(word):
+    """
+    Ключи слова для индекса: само слово и, если в слове допустима
+    опечатка, все варианты без одной буквы.
+
+    У двух слов с одной опечаткой между ними всегда есть общий ключ,
+    поэтому поиск - это несколько обращений к словарю,
+    а не сравнение со всеми словами.
+    """
+    variants = {word}
+    if max_typos(word):
+        for i in range(len(word)):
+            variants.add(word[:i] + word[i + 1:])
+    return variants
+
@@ -2,11 +2,63 @@
 Обработчики команд и сообщений бота
 """
 
+import html
 import random
 import asyncio
+import time
 from telegram import Update
 from telegram.ext import ContextTypes
 
+from database import MASTERED_THRESHOLD
+from fuzzy import max_typos, typo_distance
+from reminders import DEFAULT_OFFSET, format_offset, next_reminder_at, parse_offset
+
+# Ответ длиннее этого в режиме ввода не ищем среди похожих слов
+# и показываем обрезанным: каждая буква - ещё один ключ поиска
+MAX_ANSWER_LENGTH = 64
+
+
+class CallbackGuard:
+    """
+    Защита от повторных нажатий на inline-кнопки.
+
+    Хранит пары (chat_id, message_id), callback-и которых сейчас
+    обрабатываются. У каждой записи есть срок жизни (TTL),
+    чтобы запись не застряла навсегда, если обработчик упал.
+    """
+
+    def __init__(self, ttl=10):
+        """
+        Параметры:
+        ttl - через сколько секунд запись считается устаревшей
+        """
+        self.ttl = ttl
+        self.in_flight = {}
+
+    def acquire(self, key):
+        """
+        Пытаемся занять сообщение.
+
+        Возвращает:
+        True - если сообщение свободно, False - если это повторное нажатие
+        """
+        now = time.monotonic()
+
+        # Чистим устаревшие записи
+        expired = [k for k, expires_at in self.in_flight.items() if expires_at <= now]
+        for k in expired:
+            del self.in_flight[k]
+
+        if key in self.in_flight:
+            return False
+
+        self.in_flight[key] = now + self.ttl
+        return True
+
+    def release(self, key):
+        """Освобождаем сообщение после обработки"""
+        self.in_flight.pop(key, None)
+
 
 class Handlers:
     """
@@ -14,16 +66,25 @@ class Handlers:
     Здесь собраны все функции, которые реагируют на команды и сообщения.
     """
 
-    def __init__(self, db, keyboards):
+    def __init__(self, db, keyboards, broadcaster=None, admin_ids=(), profiler=None, backup=None):
         """
         Инициализация обработчиков.
 
         Параметры:
         db - объект базы данных (из database.py)
         keyboards - объект клавиатур (из keyboard.py)
+        broadcaster - объект рассылки (из broadcast.py)
+        admin_ids - telegram_id администраторов
+        profiler - профилировщик обработчиков (из profiler.py)
+        backup - резервное копирование базы (из backup.py)
         """
         self.db = db
         self.keyboards = keyboards
+        self.broadcaster = broadcaster
+        self.admin_ids = set(admin_ids)
+        self.profiler = profiler
+        self.backup = backup
+        self.callback_guard = CallbackGuard()
 
     async def start_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """
@@ -76,12 +137,8 @@ class Handlers:
 
         # Если слов нет - предлагаем добавить
         if not word:
-            await update.message.reply_text(
-                "📭 У вас пока нет слов для изучения.\n"
-                "Добавьте слова с помощью кнопки '➕ Добавить слово' или команды /add"
-            )
-        elif update.callback_query:
-            await update.callback_query.message.reply_text(
+            message = update.message or update.callback_query.message
+            await message.reply_text(
                 "📭 У вас пока нет слов для изучения.\n"
                 "Добавьте слова с помощью кнопки '➕ Добавить слово' или команды /add"
             )
@@ -90,6 +147,11 @@ class Handlers:
         # Сохраняем текущее слово в памяти бота (user_data)
         context.user_data['current_word'] = word
 
+        # В режиме ввода слово нужно написать самому, без вариантов
+        if context.user_data.get('quiz_mode') == 'typed':
+            await self.send_typed_question(context, update.effective_chat.id, word)
+            return
+
         # Получаем 3 неправильных варианта ответа
         wrong_answers = self.db.get_wrong_answers(word['id'], 3)
 
@@ -105,7 +167,7 @@ class Handlers:
         # Проверяем, откуда пришёл запрос и отправляем вопрос
         if update.message:
             # Если вызвано из команды /learn или кнопки "Учить слова"
-            await update.message.reply_text(
+            message = await update.message.reply_text(
                 f"📖 Как переводится слово:\n\n"
                 f"<b>{word['russian']}</b>\n\n"
                 f"Выбери правильный вариант:",
@@ -114,13 +176,116 @@ class Handlers:
             )
         elif update.callback_query:
             # Если вызвано после ответа на предыдущий вопрос
-            await update.callback_query.message.reply_text(
+            message = await update.callback_query.message.reply_text(
                 f"📖 Как переводится слово:\n\n"
                 f"<b>{word['russian']}</b>\n\n"
                 f"Выбери правильный вариант:",
                 reply_markup=reply_markup,
                 parse_mode='HTML'
             )
+        else:
+            return
+
+        # Запоминаем актуальный вопрос - нажатия на старые вопросы игнорируем
+        context.user_data['question_message_id'] = message.message_id
+        context.user_data['awaiting_answer'] = False
+
+    async def send_typed_question(self, context: ContextTypes.DEFAULT_TYPE, chat_id, word):
+        """
+        Отправляет вопрос режима ввода: ответ пользователь пишет сообщением.
+        """
+        message = await context.bot.send_message(
+            chat_id=chat_id,
+            text=f"✍️ Напиши по-английски:\n\n<b>{html.escape(word['russian'])}</b>",
+            parse_mode='HTML'
+        )
+
+        context.user_data['question_message_id'] = message.message_id
+        context.user_data['awaiting_answer'] = True
+
+    async def check_typed_answer(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """
+        Проверяет ответ, написанный в режиме ввода.
+        Одна опечатка в длинном слове засчитывается как правильный ответ.
+        """
+        current_word = context.user_data.get('current_word')
+
+        if not current_word:
+            context.user_data['awaiting_answer'] = False
+            await update.message.reply_text("❌ Произошла ошибка. Начните урок заново.")
+            return
+
+        user_id = update.effective_user.id
+        user_answer = update.message.text.strip()
+        correct_answer = current_word['english']
+
+        allowed = max_typos(correct_answer)
+        distance = typo_distance(user_answer.lower(), correct_answer.lower(), allowed)
+        is_correct = distance <= allowed
+
+        # Запоминаем результат ответа
+        self.db.record_answer(user_id, current_word['id'], is_correct)
+        context.user_data['awaiting_answer'] = False
+
+        # Слова и ответ пишут пользователи - экранируем для parse_mode='HTML'
+        correct_html = html.escape(correct_answer)
+
+        if is_correct:
+            typo_note = f"\n(с опечаткой, правильно: <b>{correct_html}</b>)" if distance else ""
+            await update.message.reply_text(
+                f"✅ <b>Правильно!</b>{typo_note}\n\n"
+                f"{html.escape(current_word['russian'])} = {correct_html}\n\n"
+                f"Молодец! 🎉",
+                parse_mode='HTML'
+            )
+
+            # Ждём 1 секунду и задаём следующий вопрос
+            await asyncio.sleep(1)
+            await self.ask_word_question(update, context)
+            return
+
+        # Возможно, пользователь написал другое слово из своего словаря
+        hint = ""
+        if len(user_answer) <= MAX_ANSWER_LENGTH:
+            similar = self.db.find_similar_words(user_id, user_answer)
+            if similar and similar[0]['id'] != current_word['id']:
+                hint = (
+                    f"\n«{html.escape(similar[0]['english'])}» - "
+                    f"это «{html.escape(similar[0]['russian'])}»"
+                )
+            shown_answer = user_answer
+        else:
+            shown_answer = user_answer[:MAX_ANSWER_LENGTH] + "…"
+
+        await update.message.reply_text(
+            f"❌ <b>Неправильно!</b>\n\n"
+            f"Правильный ответ: <b>{correct_html}</b>\n"
+            f"Твой ответ: {html.escape(shown_answer)}{hint}\n\n"
+            f"Попробуй ещё раз это слово:",
+            parse_mode='HTML'
+        )
+
+        # Ждём 2 секунды и повторяем то же слово
+        await asyncio.sleep(2)
+        await self.send_typed_question(context, update.effective_chat.id, current_word)
+
+    async def mode_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """
+        Обработчик команды /type.
+        Переключает режим урока: выбор из 4 вариантов или ввод слова.
+        """
+        if context.user_data.get('quiz_mode') == 'typed':
+            context.user_data['quiz_mode'] = 'choice'
+            context.user_data['awaiting_answer'] = False
+            await update.message.reply_text("🔘 Режим урока: выбор из 4 вариантов.")
+        else:
+            context.user_data['quiz_mode'] = 'typed'
+            await update.message.reply_text(
+                "✍️ Режим урока: ввод слова.\n"
+                "Я показываю русское слово, а ты пишешь английское. "
+                "Одна опечатка в длинном слове не считается ошибкой.\n\n"
+                "Вернуться к вариантам - снова /type"
+            )
 
     async def button_click(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """
@@ -129,25 +294,60 @@ class Handlers:
         # Получаем информацию о нажатой кнопке
         query = update.callback_query
 
-        # Обязательно отвечаем на callback
-        await query.answer()
+        # Повторное нажатие, пока прошлое ещё обрабатывается - просто отвечаем
+        key = (query.message.chat_id, query.message.message_id)
+        if not self.callback_guard.acquire(key):
+            await query.answer()
+            return
+
+        try:
+            await self.process_button_click(update, context)
+        finally:
+            self.callback_guard.release(key)
+
+    async def process_button_click(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """
+        Обработка нажатия на inline-кнопку после проверки на дубликаты.
+        """
+        query = update.callback_query
 
         # Получаем данные из кнопки
         button_data = query.data
 
-        # Получаем текущее слово из памяти
-        current_word = context.user_data.get('current_word')
+        # Нажатие на кнопку старого или уже отвеченного вопроса - отвечаем и ничего не делаем
+        if (button_data.startswith("answer_")
+                and context.user_data.get('question_message_id') != query.message.message_id):
+            await query.answer("Этот вопрос уже неактуален")
+            return
 
-        if not current_word:
-            await query.edit_message_text("❌ Произошла ошибка. Начните урок заново.")
+        # Нечего удалять - подсказываем прямо во всплывающем ответе
+        if button_data == "delconfirm" and not context.user_data.get('delete_selection'):
+            await query.answer("Сначала отметь слова для удаления")
             return
 
+        # Обязательно отвечаем на callback
+        await query.answer()
+
         # Обработка вариантов ответа
         if button_data.startswith("answer_"):
+            # Получаем текущее слово из памяти
+            current_word = context.user_data.get('current_word')
+
+            if not current_word:
+                await query.edit_message_text("❌ Произошла ошибка. Начните урок заново.")
+                return
+
             # Извлекаем ответ пользователя
             user_answer = button_data.replace("answer_", "")
             correct_answer = current_word['english']
 
+            # Запоминаем результат ответа. На этот вопрос больше не отвечаем,
+            # даже если следующий вопрос не удастся отправить
+            context.user_data.pop('question_message_id', None)
+            self.db.record_answer(
+                update.effective_user.id, current_word['id'], user_answer == correct_answer
+            )
+
             # Проверяем ответ
             if user_answer == correct_answer:
                 # Правильный ответ
@@ -178,12 +378,13 @@ class Handlers:
                     reply_markup = self.keyboards.get_answer_keyboard(all_answers)
 
                     # Отправляем новый вопрос
-                    await context.bot.send_message(
+                    message = await context.bot.send_message(
                         chat_id=query.message.chat_id,
                         text=f"📖 Как переводится слово:\n\n<b>{new_word['russian']}</b>\n\nВыбери правильный вариант:",
                         reply_markup=reply_markup,
                         parse_mode='HTML'
                     )
+                    context.user_data['question_message_id'] = message.message_id
 
             else:
                 # Неправильный ответ
@@ -205,25 +406,60 @@ class Handlers:
 
                 reply_markup = self.keyboards.get_answer_keyboard(all_answers)
 
-                await context.bot.send_message(
+                message = await context.bot.send_message(
                     chat_id=query.message.chat_id,
                     text=f"📖 Как переводится слово:\n\n<b>{current_word['russian']}</b>\n\nВыбери правильный вариант:",
                     reply_markup=reply_markup,
                     parse_mode='HTML'
                 )
+                context.user_data['question_message_id'] = message.message_id
+
+        # Подтверждение добавления слова, похожего на уже известное
+        elif button_data == "addconfirm":
+            pending_word = context.user_data.pop('pending_word', None)
+            await query.edit_message_reply_markup(reply_markup=None)
+
+            if pending_word:
+                english, russian = pending_word
+                await self.save_word(query.message, update.effective_user.id, english, russian)
+
+        elif button_data == "addcancel":
+            context.user_data.pop('pending_word', None)
+            await query.edit_message_text("Добавление отменено.")
+
+        # Отметка слова для удаления
+        elif button_data.startswith("toggle_"):
+            _, word_id, page = button_data.split("_")
+            word_id = int(word_id)
+
+            selected = context.user_data.setdefault('delete_selection', set())
+            if word_id in selected:
+                selected.discard(word_id)
+            else:
+                selected.add(word_id)
 
-        # Обработка кнопок удаления слов
-        elif button_data.startswith("delete_"):
-            # Извлекаем ID слова для удаления
-            word_id = int(button_data.replace("delete_", ""))
+            await self.show_delete_page(update, context, int(page))
 
-            # Деактивируем слово для пользователя
-            success = self.db.deactivate_word(update.effective_user.id, word_id)
+        # Переключение страницы списка удаления
+        elif button_data.startswith("delpage_"):
+            page = int(button_data.replace("delpage_", ""))
+            await self.show_delete_page(update, context, page)
 
-            if success:
-                await query.edit_message_text("✅ Слово удалено из твоих уроков!")
+        # Удаление всех отмеченных слов одной транзакцией
+        elif button_data == "delconfirm":
+            selected = context.user_data.pop('delete_selection', set())
+            context.user_data.pop('delete_words', None)
+            count = self.db.deactivate_words(update.effective_user.id, list(selected))
+
+            if count is not None:
+                await query.edit_message_text(f"✅ Удалено слов из твоих уроков: {count}")
             else:
-                await query.edit_message_text("❌ Не удалось удалить слово.")
+                await query.edit_message_text("❌ Не удалось удалить слова.")
+
+        elif button_data == "delcancel":
+            context.user_data.pop('delete_selection', None)
+            context.user_data.pop('delete_words', None)
+            await query.edit_message_text("Удаление отменено.")
 
     async def add_word_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """
@@ -238,17 +474,7 @@ class Handlers:
             russian = ' '.join(context.args[1:]).lower()
 
             # Добавляем слово в базу
-            success = self.db.add_personal_word(update.effective_user.id, english, russian)
-
-            if success:
-                await update.message.reply_text(
-                    f"✅ Слово добавлено!\n\n"
-                    f"🇬🇧 {english}\n"
-                    f"🇷🇺 {russian}\n\n"
-                    f"Теперь оно будет в твоих уроках."
-                )
-            else:
-                await update.message.reply_text("❌ Не удалось добавить слово.")
+            await self.add_word(update, context, english, russian)
         else:
             # Если аргументов нет - показываем инструкцию
             await update.message.reply_text(
@@ -258,28 +484,158 @@ class Handlers:
                 parse_mode='HTML'
             )
 
+    async def add_word(self, update: Update, context: ContextTypes.DEFAULT_TYPE, english, russian):
+        """
+        Добавляет личное слово с проверкой на похожие слова.
+
+        Если такое слово уже есть - сообщает об этом.
+        Если есть похожее (или то же слово с другим переводом) -
+        спрашивает "Может, ты имел в виду...?" и ждёт подтверждения.
+        """
+        similar = self.db.find_similar_words(update.effective_user.id, english)
+
+        for word in similar:
+            if word['english'].lower() == english and word['russian'] == russian:
+                await update.message.reply_text(
+                    f"ℹ️ Это слово уже есть в твоих уроках:\n\n"
+                    f"🇬🇧 {word['english']}\n"
+                    f"🇷🇺 {word['russian']}"
+                )
+                return
+
+        if similar:
+            # Запоминаем слово до подтверждения
+            context.user_data['pending_word'] = (english, russian)
+
+            similar_list = "\n".join(
+                f"• {word['english']} = {word['russian']}" for word in similar[:5]
+            )
+            await update.message.reply_text(
+                f"🤔 Может, ты имел в виду уже знакомое слово?\n\n"
+                f"{similar_list}\n\n"
+                f"Всё равно добавить «{english} = {russian}»?",
+                reply_markup=self.keyboards.get_confirm_add_keyboard()
+            )
+            return
+
+        await self.save_word(update.message, update.effective_user.id, english, russian)
+
+    async def save_word(self, message, telegram_id, english, russian):
+        """
+        Сохраняет личное слово и сообщает о результате.
+
+        Параметры:
+        message - сообщение, на которое отвечаем
+        """
+        success = self.db.add_personal_word(telegram_id, english, russian)
+
+        if success:
+            await message.reply_text(
+                f"✅ Слово добавлено!\n\n"
+                f"🇬🇧 {english}\n"
+                f"🇷🇺 {russian}\n\n"
+                f"Теперь оно будет в твоих уроках."
+            )
+        else:
+            await message.reply_text("❌ Не удалось добавить слово.")
+
     async def remove_word_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """
         Обработчик команды /remove.
-        Показывает список слов для удаления.
+        Показывает постраничный список слов, в котором можно отметить
+        несколько слов и удалить их одним нажатием.
+        В списке личные слова и слова из общего словаря, которые уже
+        встречались в уроках.
         """
-        # Получаем все слова пользователя
-        user_words = self.db.get_user_words(update.effective_user.id)
+        # Новый список - сбрасываем прежний выбор и результаты /find
+        context.user_data['delete_selection'] = set()
+        context.user_data.pop('delete_words', None)
 
-        if not user_words:
-            await update.message.reply_text("📭 У тебя пока нет слов для удаления.")
+        await self.show_delete_page(update, context, 0)
+
+    async def show_delete_page(self, update: Update, context: ContextTypes.DEFAULT_TYPE, page, text=None):
+        """
+        Показывает страницу списка удаления.
+        Из команды - новым сообщением, из кнопки - обновляет клавиатуру.
+
+        Если в user_data есть delete_words (результаты /find),
+        листаются они, иначе - слова пользователя.
+        """
+        user_id = update.effective_user.id
+        page_size = self.keyboards.DELETE_PAGE_SIZE
+        found_words = context.user_data.get('delete_words')
+
+        if found_words is not None:
+            total = len(found_words)
+        else:
+            total = self.db.count_user_words(user_id, include_pack=True)
+
+        if not total:
+            if update.callback_query:
+                await update.callback_query.edit_message_text("📭 У тебя пока нет слов для удаления.")
+            else:
+                await update.message.reply_text("📭 У тебя пока нет слов для удаления.")
             return
 
-        # Создаём клавиатуру для удаления слов
-        reply_markup = self.keyboards.get_delete_keyboard(user_words)
+        # Если слов стало меньше - показываем последнюю страницу
+        page = max(0, min(page, (total - 1) // page_size))
+        if found_words is not None:
+            user_words = found_words[page * page_size:(page + 1) * page_size]
+        else:
+            user_words = self.db.get_user_words(
+                user_id, limit=page_size, offset=page * page_size, include_pack=True
+            )
 
-        # Отправляем сообщение с кнопками
-        await update.message.reply_text(
-            "🗑️ Выбери слово для удаления:\n"
-            "(Оно исчезнет только из твоих уроков)",
-            reply_markup=reply_markup
+        # Создаём клавиатуру для удаления слов
+        reply_markup = self.keyboards.get_delete_keyboard(
+            user_words,
+            selected=context.user_data.get('delete_selection', set()),
+            page=page,
+            total=total,
+            page_size=page_size
         )
 
+        if update.callback_query:
+            await update.callback_query.edit_message_reply_markup(reply_markup=reply_markup)
+        else:
+            # Отправляем сообщение с кнопками
+            await update.message.reply_text(
+                text or "🗑️ Отметь слова для удаления и нажми «Удалить»:\n"
+                        "(Они исчезнут только из твоих уроков)",
+                reply_markup=reply_markup
+            )
+
+    async def remove_learned_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """
+        Обработчик команды /remove_learned.
+        Удаляет из уроков все слова, на которые пользователь
+        ответил правильно не меньше N раз (по умолчанию MASTERED_THRESHOLD -
+        столько же, сколько нужно, чтобы слово считалось выученным в /stats).
+
+        Формат: /remove_learned 10
+        """
+        min_correct = MASTERED_THRESHOLD
+        if context.args:
+            try:
+                min_correct = max(1, int(context.args[0]))
+            except ValueError:
+                await update.message.reply_text(
+                    f"📝 Формат: <code>/remove_learned {MASTERED_THRESHOLD}</code>",
+                    parse_mode='HTML'
+                )
+                return
+
+        count = self.db.deactivate_learned_words(update.effective_user.id, min_correct)
+
+        if count is None:
+            await update.message.reply_text("❌ Не удалось удалить слова.")
+        elif count == 0:
+            await update.message.reply_text(
+                f"📭 Нет слов с {min_correct} и более правильными ответами."
+            )
+        else:
+            await update.message.reply_text(f"✅ Удалено выученных слов: {count}")
+
     async def list_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """
         Обработчик команды /list.
@@ -301,20 +657,274 @@ class Handlers:
 
         await update.message.reply_text(words_list)
 
+    async def find_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """
+        Обработчик команды /find.
+        Ищет слова пользователя по началу английского или русского слова.
+        Найденные слова можно отметить и убрать из уроков,
+        в том числе слова из общего словаря.
+
+        Формат: /find ябл
+        """
+        if not context.args:
+            await update.message.reply_text(
+                "🔎 Чтобы найти слово, напиши:\n"
+                "<code>/find ябл</code> или <code>/find app</code>",
+                parse_mode='HTML'
+            )
+            return
+
+        text = ' '.join(context.args)
+        found_words = self.db.find_words(update.effective_user.id, text)
+
+        if not found_words:
+            await update.message.reply_text(f"🔎 По запросу «{text}» ничего не найдено.")
+            return
+
+        words_list = f"🔎 Найдено по запросу «{text}»:\n\n"
+
+        for i, word in enumerate(found_words, 1):
+            word_id, english, russian = word
+            words_list += f"{i}. {russian} = {english}\n"
+
+        words_list += "\nОтметь слова, которые не нужно показывать в уроках:"
+
+        # Кнопки удаления листают найденные слова, а не весь список
+        context.user_data['delete_selection'] = set()
+        context.user_data['delete_words'] = found_words
+        await self.show_delete_page(update, context, 0, text=words_list)
+
+    async def stats_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """
+        Обработчик команды /stats.
+        Показывает прогресс пользователя.
+        """
+        stats = self.db.get_user_stats(update.effective_user.id)
+
+        if not stats:
+            await update.message.reply_text("❌ Статистика пока недоступна. Нажми /start")
+            return
+
+        await update.message.reply_text(
+            f"📊 <b>Твой прогресс:</b>\n\n"
+            f"📚 Слов в уроках: {stats['total_words']} (твоих: {stats['personal_words']})\n"
+            f"🏆 Выучено: {stats['mastered_words']}\n"
+            f"✅ Правильных ответов: {stats['correct_answers']}\n"
+            f"❌ Ошибок: {stats['wrong_answers']}\n"
+            f"🎯 Точность: {stats['accuracy']:.0%}\n"
+            f"🔥 Дней подряд: {stats['streak_days']}",
+            parse_mode='HTML'
+        )
+
+    async def remind_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """
+        Обработчик команды /remind.
+        Ежедневное напоминание, если в этот день не было урока.
+
+        Формат: /remind 19 +3 (час и смещение от UTC), /remind off, /remind
+        """
+        telegram_id = update.effective_user.id
+        args = context.args or []
+
+        if not args:
+            reminder = self.db.get_reminder(telegram_id)
+            if reminder:
+                await update.message.reply_text(
+                    f"⏰ Напоминание включено: каждый день в {reminder['hour']:02d}:00 "
+                    f"({format_offset(reminder['offset'])}), если в этот день не было урока.\n"
+                    f"Выключить: /remind off"
+                )
+            else:
+                await update.message.reply_text(
+                    "⏰ Напоминание выключено.\n"
+                    "Включить: <code>/remind 19</code> или <code>/remind 19 +5</code> "
+                    "(час и смещение от UTC, по умолчанию МСК)",
+                    parse_mode='HTML'
+                )
+            return
+
+        if args[0].lower() == "off":
+            self.db.disable_reminder(telegram_id)
+            await update.message.reply_text("🔕 Напоминание выключено.")
+            return
+
+        offset = parse_offset(args[1]) if len(args) > 1 else DEFAULT_OFFSET
+        hour = int(args[0]) if args[0].isdigit() else None
+
+        if hour is None or hour > 23 or offset is None:
+            await update.message.reply_text(
+                "📝 Формат: <code>/remind 19</code> или <code>/remind 19 +5</code>",
+                parse_mode='HTML'
+            )
+            return
+
+        if not self.db.set_reminder(telegram_id, hour, offset, next_reminder_at(hour, offset)):
+            await update.message.reply_text("❌ Не удалось включить напоминание. Нажми /start")
+            return
+
+        await update.message.reply_text(
+            f"⏰ Буду напоминать каждый день в {hour:02d}:00 ({format_offset(offset)}), "
+            f"если в этот день не было урока.\n"
+            f"Выключить: /remind off"
+        )
+
+    def is_admin(self, update: Update):
+        """Является ли отправитель администратором"""
+        return update.effective_user.id in self.admin_ids
+
+    async def broadcast_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """
+        Обработчик команды /broadcast (только для администраторов).
+        Запускает рассылку сообщения всем пользователям.
+
+        Формат: /broadcast Текст сообщения
+        """
+        if not self.is_admin(update) or not self.broadcaster:
+            return
+
+        # Текст берём целиком, чтобы сохранить переносы строк
+        parts = update.message.text.split(maxsplit=1)
+        if len(parts) < 2:
+            await update.message.reply_text(
+                "📣 Формат: <code>/broadcast Текст сообщения</code>\n"
+                "/broadcast_status - прогресс, /broadcast_cancel - отмена",
+                parse_mode='HTML'
+            )
+            return
+
+        if self.broadcaster.is_running():
+            await update.message.reply_text("⏳ Уже идёт другая рассылка. Смотри /broadcast_status")
+            return
+
+        # Рассылка числится идущей, но её задачи нет - продолжаем её,
+        # иначе новые рассылки были бы заблокированы навсегда
+        stale = self.db.get_running_broadcast()
+        if stale:
+            self.broadcaster.resume(context.bot)
+            await update.message.reply_text(
+                f"⏳ Рассылка #{stale['id']} была прервана - продолжаю её.\n"
+                f"Новую рассылку можно запустить, когда она закончится (/broadcast_status)."
+            )
+            return
+
+        broadcast_id = self.db.create_broadcast(parts[1], update.effective_user.id)
+        self.broadcaster.start(context.bot, broadcast_id)
+
+        await update.message.reply_text(
+            f"📣 Рассылка #{broadcast_id} запущена.\n"
+            f"Когда она закончится, я пришлю отчёт."
+        )
+
+    async def broadcast_status_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """
+        Обработчик команды /broadcast_status (только для администраторов).
+        Показывает прогресс последней рассылки.
+        """
+        if not self.is_admin(update) or not self.broadcaster:
+            return
+
+        broadcast = self.db.get_broadcast()
+        if not broadcast:
+            await update.message.reply_text("📭 Рассылок ещё не было.")
+            return
+
+        await update.message.reply_text(self.broadcaster.format_report(broadcast))
+
+    async def broadcast_cancel_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """
+        Обработчик команды /broadcast_cancel (только для администраторов).
+        Отменяет текущую рассылку.
+        """
+        if not self.is_admin(update) or not self.broadcaster:
+            return
+
+        broadcast = self.db.get_running_broadcast()
+        if not broadcast:
+            await update.message.reply_text("📭 Сейчас нет активной рассылки.")
+            return
+
+        self.broadcaster.cancel(broadcast['id'])
+        await update.message.reply_text(
+            self.broadcaster.format_report(self.db.get_broadcast(broadcast['id']))
+        )
+
+    async def backup_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """
+        Обработчик команды /backup (только для администраторов).
+        Делает резервную копию базы, не останавливая бота.
+        Если копирование уже идёт - показывает прогресс.
+        """
+        if not self.is_admin(update) or not self.backup:
+            return
+
+        if self.backup.is_running():
+            await update.message.reply_text(self.backup.format_status())
+            return
+
+        self.backup.start(context.bot, update.effective_chat.id)
+        await update.message.reply_text(
+            "💾 Резервное копирование запущено.\n"
+            "Когда оно закончится, я пришлю отчёт."
+        )
+
+    async def profile_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """
+        Обработчик команды /profile (только для администраторов).
+        Включает и выключает профилирование без перезапуска бота.
+
+        Формат:
+        /profile on [N] [мс] - каждое N-е обновление и все дольше мс
+        /profile off - выключить и сохранить стеки
+        /profile reset - забыть собранное
+        /profile - состояние
+        """
+        if not self.is_admin(update) or not self.profiler:
+            return
+
+        args = context.args or []
+        action = args[0].lower() if args else "status"
+
+        if action == "on":
+            try:
+                sample_every = int(args[1]) if len(args) > 1 else None
+                slow_threshold = int(args[2]) / 1000 if len(args) > 2 else None
+            except ValueError:
+                await update.message.reply_text(
+                    "📝 Формат: <code>/profile on 100 500</code>",
+                    parse_mode='HTML'
+                )
+                return
+
+            self.profiler.enable(sample_every, slow_threshold)
+
+        elif action == "off":
+            path = self.profiler.disable()
+            await update.message.reply_text(f"💾 Стеки сохранены в {path}")
+
+        elif action == "reset":
+            self.profiler.reset()
+
+        await update.message.reply_text(self.profiler.format_status())
+
     async def help_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """
         Обработчик команды /help и кнопки "Помощь".
         Показывает справку по боту.
         """
-        help_text = """
+        help_text = f"""
 🤖 <b>Помощь по боту:</b>
 
 <b>Основные команды:</b>
 /start - Начало работы
 /learn - Начать урок
+/type - Режим урока: варианты или ввод слова
 /add - Добавить слово
-/remove - Удалить слово
+/remove - Удалить слова
+/remove_learned - Удалить выученные слова
 /list - Список слов
+/find - Найти слово
+/stats - Твой прогресс
+/remind - Ежедневное напоминание
 /help - Эта справка
 
 <b>Добавление слов:</b>
@@ -325,14 +935,22 @@ class Handlers:
 1. Бот показывает русское слово
 2. Ты выбираешь английский перевод из 4 вариантов
 3. Бот проверяет ответ и показывает результат
+В режиме /type английское слово нужно написать самому,
+одна опечатка в длинном слове не считается ошибкой.
 
 <b>Удаление слов:</b>
+В /remove отметь несколько слов и нажми «Удалить».
+<code>/remove_learned</code> удалит слова, на которые ты
+ответил правильно {MASTERED_THRESHOLD} раз и больше (или укажи число: <code>/remove_learned 5</code>).
 Слова удаляются только из твоих уроков.
 Другие пользователи их всё ещё видят.
 
 <b>Общие слова:</b>
-У бота уже есть 13 общих слов (цвета и местоимения).
-Они доступны всем пользователям.
+У бота есть общий словарь (цвета, местоимения и тематические наборы).
+Он доступен всем пользователям, а /list показывает только твои слова.
+Если у тебя есть свои слова, половина вопросов будет по ним.
+Слово из словаря, которое уже было в уроке, можно убрать через /remove,
+любое другое - найти через /find и отметить.
 """
 
         await update.message.reply_text(help_text, parse_mode='HTML')
@@ -365,6 +983,10 @@ class Handlers:
         elif text == "❓ Помощь":
             await self.help_command(update, context)
 
+        # Ответ в режиме ввода слова
+        elif context.user_data.get('awaiting_answer') and "=" not in text:
+            await self.check_typed_answer(update, context)
+
         # Обработка добавления слова через "="
         elif "=" in text:
             try:
@@ -375,16 +997,7 @@ class Handlers:
                     english = parts[1].strip()
 
                     # Добавляем слово
-                    success = self.db.add_personal_word(update.effective_user.id, english, russian)
-
-                    if success:
-                        await update.message.reply_text(
-                            f"✅ Слово добавлено!\n\n"
-                            f"🇷🇺 {russian}\n"
-                            f"🇬🇧 {english}"
-                        )
-                    else:
-                        await update.message.reply_text("❌ Не удалось добавить слово.")
+                    await self.add_word(update, context, english.lower(), russian.lower())
             except Exception as e:
                 await update.message.reply_text("❌ Неверный формат. Используй: слово = перевод")
 
@@ -11,6 +11,9 @@ class Keyboards:
     Все клавиатуры собраны здесь для удобства.
     """
 
+    # Сколько слов показывать на одной странице удаления
+    DELETE_PAGE_SIZE = 10
+
     @staticmethod
     def get_main_keyboard():
         """
@@ -51,19 +54,24 @@ class Keyboards:
         return InlineKeyboardMarkup(buttons)
 
     @staticmethod
-    def get_delete_keyboard(words_list):
+    def get_delete_keyboard(words_list, selected=(), page=0, total=0, page_size=None):
         """
-        Клавиатура для удаления слов.
+        Клавиатура для удаления слов с выбором нескольких слов.
 
         Параметры:
-        words_list - список слов пользователя [(id, english, russian), ...]
+        words_list - слова текущей страницы [(id, english, russian), ...]
+        selected - ID уже выбранных слов
+        page - номер текущей страницы (с нуля)
+        total - сколько всего слов у пользователя
+        page_size - сколько слов на одной странице
 
         Возвращает:
         InlineKeyboardMarkup - клавиатура со словами для удаления
         """
+        page_size = page_size or Keyboards.DELETE_PAGE_SIZE
         buttons = []
 
-        for word in words_list[:10]:  # Показываем не более 10 слов
+        for word in words_list:
             word_id, english, russian = word
 
             # Обрезаем длинные слова для отображения на кнопке
@@ -72,12 +80,41 @@ class Keyboards:
             else:
                 display_text = f"{russian} ({english})"
 
-            # Кнопка для удаления конкретного слова
+            # Нажатие отмечает слово или снимает отметку
+            mark = "☑️" if word_id in selected else "⬜"
             buttons.append([
                 InlineKeyboardButton(
-                    f"❌ {display_text}",
-                    callback_data=f"delete_{word_id}"
+                    f"{mark} {display_text}",
+                    callback_data=f"toggle_{word_id}_{page}"
                 )
             ])
 
-        return InlineKeyboardMarkup(buttons)
\ No newline at end of file
+        # Переключение страниц
+        navigation = []
+        if page > 0:
+            navigation.append(InlineKeyboardButton("⬅️", callback_data=f"delpage_{page - 1}"))
+        if (page + 1) * page_size < total:
+            navigation.append(InlineKeyboardButton("➡️", callback_data=f"delpage_{page + 1}"))
+        if navigation:
+            buttons.append(navigation)
+
+        buttons.append([
+            InlineKeyboardButton(f"🗑️ Удалить ({len(selected)})", callback_data="delconfirm"),
+            InlineKeyboardButton("✖️ Отмена", callback_data="delcancel")
+        ])
+
+        return InlineKeyboardMarkup(buttons)
+
+    @staticmethod
+    def get_confirm_add_keyboard():
+        """
+        Клавиатура подтверждения добавления слова,
+        похожего на уже известное.
+
+        Возвращает:
+        InlineKeyboardMarkup - кнопки "Добавить" и "Отмена"
+        """
+        return InlineKeyboardMarkup([[
+            InlineKeyboardButton("✅ Всё равно добавить", callback_data="addconfirm"),
+            InlineKeyboardButton("✖️ Отмена", callback_data="addcancel")
+        ]])
\ No newline at end of file
@@ -0,0 +1,154 @@
+"""
+Настройка логирования бота
+"""
+
+import contextvars
+import datetime
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import time
+
+
+# Кто и какой обработчик сейчас выполняется - подставляется в каждую запись лога
+current_user_id = contextvars.ContextVar("current_user_id", default=None)
+current_handler = contextvars.ContextVar("current_handler", default=None)
+
+
+class ContextFilter(logging.Filter):
+    """
+    Добавляет в запись user_id и handler текущего обновления.
+    Работает в потоке, который пишет в лог, поэтому видит contextvars.
+    """
+
+    def filter(self, record):
+        if getattr(record, "user_id", None) is None:
+            record.user_id = current_user_id.get()
+        if getattr(record, "handler", None) is None:
+            record.handler = current_handler.get()
+        return True
+
+
+class ErrorSampler(logging.Filter):
+    """
+    Ограничивает повторяющиеся предупреждения и ошибки.
+
+    Одинаковыми считаются записи с тем же логгером, шаблоном сообщения,
+    типом исключения и обработчиком. За окно window секунд пропускаются первые burst
+    таких записей, остальные отбрасываются; первая запись следующего
+    окна получает поле suppressed - сколько записей было отброшено.
+    """
+
+    def __init__(self, burst=5, window=60):
+        """
+        Параметры:
+        burst - сколько одинаковых записей пропускать за окно
+        window - длина окна в секундах
+        """
+        super().__init__()
+        self.burst = burst
+        self.window = window
+        # ключ -> [начало окна, записей в окне, отброшено]
+        self.state = {}
+
+    def filter(self, record):
+        if record.levelno < logging.WARNING:
+            return True
+
+        exc_type = record.exc_info[0] if record.exc_info else None
+        key = (record.name, record.msg, exc_type, getattr(record, "handler", None))
+        now = time.monotonic()
+        state = self.state.get(key)
+
+        if state is None or now - state[0] >= self.window:
+            if state and state[2]:
+                record.suppressed = state[2]
+            self.state[key] = [now, 1, 0]
+            return True
+
+        state[1] += 1
+        if state[1] <= self.burst:
+            return True
+
+        state[2] += 1
+        return False
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Запись лога одной строкой JSON:
+    {"time", "level", "logger", "message", "user_id", "handler", "duration_ms", ...}
+    """
+
+    # Необязательные поля: попадают в JSON, только если заданы
+    EXTRA_FIELDS = ("user_id", "handler", "duration_ms", "suppressed")
+
+    def format(self, record):
+        data = {
+            "time": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc)
+                    .isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+
+        for field in self.EXTRA_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                data[field] = value
+
+        if record.exc_info:
+            data["exception"] = self.formatException(record.exc_info)
+
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler, который не форматирует запись в потоке бота.
+
+    Стандартный QueueHandler сразу склеивает сообщение и traceback.
+    Мы кладём запись в очередь как есть - форматирование и запись
+    в stdout делает фоновый поток QueueListener.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+def setup_logging(level="INFO", stream=None):
+    """
+    Включаем логирование через очередь.
+
+    Код бота только кладёт запись в очередь, а форматирует и пишет
+    её фоновый поток, поэтому медленный stdout не тормозит цикл событий.
+
+    Параметры:
+    level - уровень логирования (DEBUG, INFO, ...)
+    stream - куда писать (по умолчанию stdout)
+
+    Возвращает:
+    QueueListener - его нужно остановить при выходе (stop())
+    """
+    log_queue = queue.SimpleQueue()
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JsonFormatter())
+    listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+
+    queue_handler = DeferredQueueHandler(log_queue)
+    queue_handler.addFilter(ContextFilter())
+    queue_handler.addFilter(ErrorSampler())
+
+    root = logging.getLogger()
+    root.handlers[:] = [queue_handler]
+    root.setLevel(level)
+
+    # httpx пишет каждый запрос к Telegram, а apscheduler - каждый запуск задачи JobQueue
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    logging.getLogger("apscheduler").setLevel(logging.WARNING)
+
+    listener.start()
+    return listener
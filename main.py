@@ -2,6 +2,7 @@
 Главный файл для запуска бота
 """
 
+import logging
 import sys
 import os
 
@@ -11,7 +12,16 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from database import Database
 from keyboard import Keyboards
 from handlers import Handlers
+from maintenance import Maintenance
+from broadcast import Broadcaster
+from profiler import SamplingProfiler
+from reminders import Reminders
+from backup import Backup
 from bot import EnglishBot
+from logs import setup_logging
+
+
+logger = logging.getLogger(__name__)
 
 
 def get_token():
@@ -34,50 +44,82 @@ def get_token():
     if token:
         return token
 
-    print("Токен бота не найден!")
+    logger.error("Токен бота не найден!")
 
     return None
 
 
+def get_admin_ids():
+    """
+    Получаем telegram_id администраторов из переменной окружения ADMIN_IDS.
+    Формат: ADMIN_IDS=123456,789012
+    """
+    admin_ids = os.environ.get("ADMIN_IDS", "")
+    return {int(admin_id) for admin_id in admin_ids.split(",") if admin_id.strip().isdigit()}
+
+
 def main():
     """
     Главная функция программы.
     Создаёт все компоненты и запускает бота.
     """
-    print("=" * 50)
-    print("Запуск бота")
-    print("=" * 50)
+    # Логи пишет фоновый поток; LOG_LEVEL=DEBUG - длительность каждого обновления
+    listener = setup_logging(os.environ.get("LOG_LEVEL", "INFO"))
+    logger.info("Запуск бота")
 
     token = get_token()
     if not token:
+        listener.stop()
         return
 
     try:
-        print("\n Создание базы данных")
-        db = Database()
+        logger.info("Создание базы данных")
+        db = Database(pack_path=os.environ.get("DICTIONARY_PACK", "dictionary_pack.db"))
 
-        print("Создание клавиатуры")
+        logger.info("Создание клавиатуры")
         keyboards = Keyboards()
 
-        print("Создание обработчиков")
-        handlers = Handlers(db, keyboards)
+        logger.info("Создание рассылки")
+        broadcaster = Broadcaster(db)
 
-        print("Создание бота")
-        bot = EnglishBot(token, db, keyboards, handlers)
+        logger.info("Создание профилировщика")
+        profiler = SamplingProfiler(output_dir=os.environ.get("PROFILE_DIR", "profiles"))
 
-        print("\n" + "=" * 50)
-        print("Программа запущена")
-        print("=" * 50)
+        logger.info("Создание резервного копирования")
+        backup = Backup(
+            db.db_name,
+            output_dir=os.environ.get("BACKUP_DIR", "backups"),
+            hour=int(os.environ.get("BACKUP_HOUR", 3))
+        )
 
+        logger.info("Создание обработчиков")
+        handlers = Handlers(db, keyboards, broadcaster, get_admin_ids(), profiler, backup)
+
+        logger.info("Создание обслуживания базы")
+        maintenance = Maintenance(
+            db,
+            hour=int(os.environ.get("MAINTENANCE_HOUR", 4)),
+            batch_size=int(os.environ.get("MAINTENANCE_BATCH_SIZE", 500)),
+            prune=os.environ.get("MAINTENANCE_PRUNE", "1") != "0",
+            prune_min_age_days=int(os.environ.get("PRUNE_MIN_AGE_DAYS", 30))
+        )
+
+        logger.info("Создание напоминаний")
+        reminders = Reminders(db, broadcaster)
+
+        logger.info("Создание бота")
+        bot = EnglishBot(token, db, keyboards, handlers, maintenance, profiler, reminders, backup)
+
+        logger.info("Программа запущена")
 
         bot.run()
 
     except KeyboardInterrupt:
         # Пользователь нажал Ctrl+C
-        print("\n\n👋 Бот остановлен пользователем")
+        logger.info("Бот остановлен пользователем")
 
-    except Exception as e:
-        print(f"\n\n❌ Ошибка при работе бота: {e}")
+    except Exception:
+        logger.exception("Ошибка при работе бота")
 
     finally:
         try:
@@ -86,6 +128,9 @@ def main():
         except:
             pass
 
+        # Дописываем оставшиеся в очереди записи лога
+        listener.stop()
+
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
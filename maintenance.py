@@ -0,0 +1,192 @@
+"""
+Плановое обслуживание базы данных
+"""
+
+import asyncio
+import datetime
+import logging
+import time
+
+
+logger = logging.getLogger(__name__)
+
+
+class Maintenance:
+    """
+    Обслуживание базы данных по расписанию (JobQueue).
+
+    Раз в сутки, в тихие часы:
+    - удаляет деактивированные связи и брошенные личные слова;
+    - обновляет статистику планировщика (ANALYZE);
+    - возвращает свободные страницы (incremental vacuum);
+    - переносит WAL в основной файл (checkpoint).
+
+    Всё делается маленькими порциями с паузами между ними,
+    чтобы бот продолжал быстро отвечать пользователям. Порция очистки
+    ограничена и по числу просмотренных строк: большие таблицы проходятся
+    за несколько запусков, место остановки запоминается в self.cursors.
+    """
+
+    def __init__(self, db, hour=4, batch_size=500, vacuum_pages=256,
+                 pause=0.05, time_budget=60, prune=True, prune_min_age_days=30):
+        """
+        Параметры:
+        db - объект базы данных
+        hour - час запуска (UTC)
+        batch_size - сколько строк удалять за одну порцию
+        vacuum_pages - сколько страниц освобождать за одну порцию
+        pause - пауза между порциями в секундах
+        time_budget - сколько секунд можно потратить на очистку за один запуск
+        prune - удалять ли деактивированные и брошенные записи
+        prune_min_age_days - через сколько дней после удаления слова
+                             из уроков стирать его историю ответов
+        """
+        self.db = db
+        self.hour = hour
+        self.batch_size = batch_size
+        self.vacuum_pages = vacuum_pages
+        self.pause = pause
+        self.time_budget = time_budget
+        self.prune = prune
+        self.prune_min_age_days = prune_min_age_days
+
+        # Отчёт о последнем запуске: [(шаг, секунды, результат), ...]
+        self.last_report = []
+        # Бот останавливается - прерываем очистку после текущей порции
+        self.stopping = False
+        # Где остановилась очистка каждого шага: шаг -> курсор
+        self.cursors = {}
+
+    def schedule(self, job_queue):
+        """
+        Ставим ежедневный запуск в JobQueue.
+
+        Параметры:
+        job_queue - application.job_queue (None, если не установлен
+                    python-telegram-bot[job-queue])
+        """
+        if job_queue is None:
+            logger.warning("JobQueue недоступна, обслуживание базы не запланировано")
+            return
+
+        job_queue.run_daily(
+            self.run_job,
+            time=datetime.time(hour=self.hour, tzinfo=datetime.timezone.utc),
+            name="db_maintenance"
+        )
+        logger.info("Обслуживание базы запланировано на %02d:00 UTC", self.hour)
+
+    def stop(self):
+        """
+        Просим прервать обслуживание (при остановке бота).
+        JobQueue ждёт запущенные задачи, поэтому они должны закончиться быстро.
+        """
+        self.stopping = True
+
+    def should_continue(self, deadline):
+        """Можно ли делать следующую порцию"""
+        return not self.stopping and time.monotonic() < deadline
+
+    async def run_job(self, context):
+        """Колбэк для JobQueue"""
+        try:
+            await self.run()
+        except Exception:
+            logger.exception("Ошибка при обслуживании базы")
+
+    async def run(self):
+        """
+        Выполняем все шаги обслуживания.
+
+        Возвращает:
+        Отчёт [(шаг, секунды, результат), ...]
+        """
+        report = []
+        deadline = time.monotonic() + self.time_budget
+
+        if self.prune:
+            for step, prune in (
+                ("Удаление неактивных связей",
+                 lambda limit, after: self.db.prune_inactive_user_words(limit, after, self.prune_min_age_days)),
+                ("Удаление пустого прогресса", self.db.prune_empty_pack_progress),
+                ("Удаление брошенных слов", self.db.prune_orphan_words),
+            ):
+                started = time.monotonic()
+                removed = await self.prune_in_chunks(step, prune, deadline)
+                report.append((step, time.monotonic() - started, f"строк: {removed}"))
+
+        started = time.monotonic()
+        self.db.analyze()
+        report.append(("ANALYZE", time.monotonic() - started, "статистика обновлена"))
+        await asyncio.sleep(self.pause)
+
+        started = time.monotonic()
+        result = await self.vacuum_in_chunks(deadline)
+        report.append(("Incremental vacuum", time.monotonic() - started, result))
+
+        started = time.monotonic()
+        wal_before = self.db.get_wal_size()
+        self.db.checkpoint()
+        wal_after = self.db.get_wal_size()
+        report.append((
+            "WAL checkpoint",
+            time.monotonic() - started,
+            f"освобождено {(wal_before - wal_after) // 1024} КБ"
+        ))
+
+        self.last_report = report
+        logger.info("%s", self.format_report())
+        return report
+
+    async def prune_in_chunks(self, step, prune, deadline):
+        """
+        Вызываем prune порциями, пока таблица не пройдена до конца
+        и не вышло время. Если время вышло, следующий запуск
+        продолжит с того же места.
+
+        Параметры:
+        step - название шага (ключ курсора)
+        prune - функция (limit, after) -> (удалено, курсор или None)
+        deadline - до какого момента (time.monotonic) можно работать
+
+        Возвращает:
+        Сколько строк удалено всего
+        """
+        total = 0
+        while self.should_continue(deadline):
+            removed, after = prune(self.batch_size, self.cursors.get(step))
+            total += removed
+            if after is None:
+                # Дошли до конца - в следующий раз начнём сначала
+                self.cursors.pop(step, None)
+                break
+            self.cursors[step] = after
+            # Отдаём управление обработчикам пользователей
+            await asyncio.sleep(self.pause)
+        return total
+
+    async def vacuum_in_chunks(self, deadline):
+        """
+        Освобождаем свободные страницы порциями.
+
+        Возвращает:
+        Строку с результатом для отчёта
+        """
+        if not self.db.is_incremental_vacuum():
+            return "пропущено: нет auto_vacuum = INCREMENTAL (python database.py enable-incremental-vacuum)"
+
+        freed = 0
+        free_pages, page_size = self.db.get_free_pages()
+        while free_pages > 0 and self.should_continue(deadline):
+            freed += self.db.incremental_vacuum(self.vacuum_pages)
+            free_pages, _ = self.db.get_free_pages()
+            await asyncio.sleep(self.pause)
+
+        return f"освобождено {freed * page_size // 1024} КБ"
+
+    def format_report(self):
+        """Отчёт о последнем запуске в виде текста"""
+        lines = ["🧹 Обслуживание базы:"]
+        for step, seconds, result in self.last_report:
+            lines.append(f"- {step}: {seconds * 1000:.0f} мс, {result}")
+        return "\n".join(lines)
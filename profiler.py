@@ -0,0 +1,211 @@
+"""
+Профилирование обработчиков бота
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+
+# Кадры цикла событий asyncio - в стеке обработчика они не интересны
+ASYNCIO_DIR = os.path.dirname(os.path.abspath(asyncio.__file__))
+
+
+class SamplingProfiler:
+    """
+    Сэмплирующий профилировщик обработчиков.
+
+    Пока обработчик выполняется, отдельный поток несколько сотен раз
+    в секунду снимает стек потока цикла событий. Обработчики в это время
+    не замедляются: никаких sys.setprofile / sys.settrace.
+
+    Сохраняются стеки каждого sample_every-го обновления и всех
+    обновлений дольше slow_threshold секунд. Стеки складываются в файл
+    в формате "folded" (flamegraph.pl, speedscope):
+
+        handler;module:func:line;module:func:line 42
+    """
+
+    def __init__(self, output_dir="profiles", sample_every=100, slow_threshold=0.5, interval=0.005):
+        """
+        Параметры:
+        output_dir - куда писать стеки
+        sample_every - профилировать каждое N-е обновление
+        slow_threshold - всегда профилировать обновления дольше этого (секунды)
+        interval - как часто снимать стек (секунды)
+        """
+        self.output_dir = output_dir
+        self.sample_every = sample_every
+        self.slow_threshold = slow_threshold
+        self.interval = interval
+        self.enabled = False
+
+        # Собранные стеки: "стек" -> сколько раз встретился
+        self.stacks = Counter()
+        # Время по обработчикам: имя -> [обновлений, секунд]
+        self.timings = {}
+        self.updates_seen = 0
+        self.updates_kept = 0
+
+        # Записи обновлений, которые выполняются прямо сейчас: token -> (handler, Counter)
+        self.recordings = {}
+        self.next_token = 0
+        self.lock = threading.Lock()
+        self.has_recordings = threading.Event()
+        self.thread = None
+        self.target_thread_id = None
+
+    def enable(self, sample_every=None, slow_threshold=None):
+        """
+        Включаем профилирование (без перезапуска бота).
+        Вызывать из потока цикла событий.
+        """
+        if sample_every:
+            self.sample_every = sample_every
+        if slow_threshold is not None:
+            self.slow_threshold = slow_threshold
+
+        self.target_thread_id = threading.get_ident()
+        self.enabled = True
+
+        # После disable() событие могло остаться взведённым
+        with self.lock:
+            if not self.recordings:
+                self.has_recordings.clear()
+
+        if self.thread is None or not self.thread.is_alive():
+            self.thread = threading.Thread(target=self.sample_loop, name="profiler", daemon=True)
+            self.thread.start()
+
+    def disable(self):
+        """
+        Выключаем профилирование и сохраняем собранные стеки.
+
+        Возвращает:
+        Путь к файлу со стеками
+        """
+        self.enabled = False
+        self.has_recordings.set()  # будим поток, чтобы он завершился
+        return self.flush()
+
+    def begin(self, handler):
+        """
+        Начинаем запись стеков для обработчика.
+
+        Возвращает:
+        token для end()
+        """
+        with self.lock:
+            self.next_token += 1
+            token = self.next_token
+            self.recordings[token] = (handler, Counter())
+            self.has_recordings.set()
+        return token
+
+    def end(self, token, duration):
+        """
+        Заканчиваем запись и решаем, сохранять ли её.
+
+        Параметры:
+        token - из begin()
+        duration - сколько выполнялся обработчик (секунды)
+        """
+        with self.lock:
+            handler, samples = self.recordings.pop(token)
+            if not self.recordings:
+                self.has_recordings.clear()
+
+            self.updates_seen += 1
+            total = self.timings.setdefault(handler, [0, 0.0])
+            total[0] += 1
+            total[1] += duration
+
+            if self.updates_seen % self.sample_every == 0 or duration >= self.slow_threshold:
+                self.updates_kept += 1
+                self.stacks.update(samples)
+
+    def sample_loop(self):
+        """Поток, который снимает стеки"""
+        while self.enabled:
+            self.has_recordings.wait()
+            if not self.enabled:
+                break
+
+            frame = sys._current_frames().get(self.target_thread_id)
+            stack = self.fold_stack(frame)
+
+            with self.lock:
+                for handler, samples in self.recordings.values():
+                    samples[f"{handler};{stack}" if stack else f"{handler};[ожидание]"] += 1
+
+            time.sleep(self.interval)
+
+    @staticmethod
+    def fold_stack(frame):
+        """
+        Стек в формате "внешний;...;внутренний".
+
+        Берём кадры от места, где сейчас выполняется код, до ближайшего
+        кадра asyncio: выше него только цикл событий и код запуска бота.
+        """
+        frames = []
+        while frame is not None:
+            code = frame.f_code
+            if code.co_filename.startswith(ASYNCIO_DIR):
+                if frames:
+                    break
+            else:
+                module = os.path.splitext(os.path.basename(code.co_filename))[0]
+                frames.append(f"{module}:{code.co_name}:{frame.f_lineno}")
+            frame = frame.f_back
+
+        frames.reverse()
+        return ";".join(frames)
+
+    def flush(self):
+        """
+        Записываем собранные стеки на диск.
+
+        Возвращает:
+        Путь к файлу
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, "stacks.folded")
+
+        with self.lock:
+            lines = [f"{stack} {count}" for stack, count in self.stacks.most_common()]
+
+        with open(path, "w", encoding="utf-8") as file:
+            file.write("\n".join(lines) + "\n")
+
+        return path
+
+    def reset(self):
+        """Забываем собранные стеки и время"""
+        with self.lock:
+            self.stacks.clear()
+            self.timings.clear()
+            self.updates_seen = 0
+            self.updates_kept = 0
+
+    def format_status(self):
+        """Состояние профилировщика в виде текста"""
+        lines = [
+            f"🔬 Профилирование: {'включено' if self.enabled else 'выключено'}",
+            f"Каждое {self.sample_every}-е обновление и все дольше {self.slow_threshold * 1000:.0f} мс",
+            f"Обновлений: {self.updates_seen}, сохранено: {self.updates_kept}, стеков: {len(self.stacks)}",
+        ]
+
+        with self.lock:
+            slowest = sorted(self.timings.items(), key=lambda item: item[1][1], reverse=True)[:5]
+
+        if slowest:
+            lines.append("")
+            lines.append("Обработчики по суммарному времени:")
+            for handler, (count, seconds) in slowest:
+                lines.append(f"- {handler}: {count} раз, {seconds * 1000 / count:.0f} мс в среднем")
+
+        return "\n".join(lines)
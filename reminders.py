@@ -0,0 +1,198 @@
+"""
+Ежедневные напоминания о практике
+"""
+
+import asyncio
+import datetime
+import logging
+import re
+import time
+
+
+logger = logging.getLogger(__name__)
+
+# Смещение от UTC по умолчанию, если пользователь его не указал (МСК, минуты)
+DEFAULT_OFFSET = 180
+
+REMINDER_TEXT = (
+    "⏰ Сегодня ещё не было урока!\n"
+    "Пара минут в день - и слова не забудутся. Начать: /learn\n\n"
+    "Выключить напоминания: /remind off"
+)
+
+
+def next_reminder_at(hour, offset, now=None):
+    """
+    Ближайший момент, когда у пользователя наступит hour:00 по местному времени.
+
+    Параметры:
+    hour - час по местному времени (0-23)
+    offset - смещение местного времени от UTC в минутах
+    now - текущее unix-время (по умолчанию - сейчас)
+
+    Возвращает:
+    unix-время
+    """
+    now = int(time.time()) if now is None else now
+    local_now = now + offset * 60
+    local_at = local_now - local_now % 86400 + hour * 3600
+    if local_at <= local_now:
+        local_at += 86400
+    return local_at - offset * 60
+
+
+def local_date(offset, now=None):
+    """
+    Какое сейчас число у пользователя.
+
+    По этой дате считаются серия дней и "сегодня уже занимался",
+    поэтому день начинается в полночь пользователя, а не сервера.
+
+    Параметры:
+    offset - смещение местного времени от UTC в минутах (None - DEFAULT_OFFSET)
+    now - текущее unix-время (по умолчанию - сейчас)
+
+    Возвращает:
+    datetime.date
+    """
+    now = time.time() if now is None else now
+    offset = DEFAULT_OFFSET if offset is None else offset
+    return datetime.datetime.fromtimestamp(now + offset * 60, datetime.timezone.utc).date()
+
+
+def parse_offset(text):
+    """
+    Разбираем смещение от UTC: "+3", "-5", "+5:30", "UTC+3".
+
+    Возвращает:
+    Смещение в минутах или None, если формат неверный
+    """
+    match = re.fullmatch(r"(?:utc|gmt)?([+-]?)(\d{1,2})(?::(\d{2}))?", text.strip().lower())
+    if not match:
+        return None
+
+    sign, hours, minutes = match.groups()
+    offset = int(hours) * 60 + int(minutes or 0)
+    if offset > 14 * 60 or int(minutes or 0) >= 60:
+        return None
+    return -offset if sign == "-" else offset
+
+
+def format_offset(offset):
+    """Смещение в минутах -> "UTC+3", "UTC+5:30" """
+    sign = "-" if offset < 0 else "+"
+    hours, minutes = divmod(abs(offset), 60)
+    return f"UTC{sign}{hours}" + (f":{minutes:02d}" if minutes else "")
+
+
+class Reminders:
+    """
+    Напоминания тем, кто сегодня ещё не занимался.
+
+    Одна повторяющаяся задача JobQueue раз в interval секунд забирает
+    из базы порции пользователей, у которых наступило next_reminder_at
+    (по частичному индексу - остальные пользователи не читаются).
+    Сообщения уходят через Broadcaster.send, то есть через общий
+    RateLimiter вместе с рассылками. Задач на каждого пользователя
+    нет, поэтому запуск бота не зависит от числа подписчиков.
+    """
+
+    def __init__(self, db, sender, interval=60, batch_size=200, concurrency=10, time_budget=50):
+        """
+        Параметры:
+        db - объект базы данных
+        sender - объект с методом send(bot, telegram_id, text) (Broadcaster)
+        interval - как часто проверять напоминания (секунды)
+        batch_size - сколько пользователей забирать за раз
+        concurrency - сколько сообщений отправлять одновременно
+        time_budget - сколько секунд можно отправлять за один запуск
+                      (меньше interval, чтобы запуски не накладывались)
+        """
+        self.db = db
+        self.sender = sender
+        self.interval = interval
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.time_budget = time_budget
+
+        # Бот останавливается - больше не отправляем
+        self.stopping = False
+
+    def schedule(self, job_queue):
+        """
+        Ставим повторяющуюся задачу в JobQueue.
+
+        Параметры:
+        job_queue - application.job_queue (None, если не установлен
+                    python-telegram-bot[job-queue])
+        """
+        if job_queue is None:
+            logger.warning("JobQueue недоступна, напоминания не запланированы")
+            return
+
+        job_queue.run_repeating(self.run_job, interval=self.interval, first=self.interval, name="reminders")
+        logger.info("Напоминания проверяются раз в %d с", self.interval)
+
+    def stop(self):
+        """
+        Просим прервать отправку (при остановке бота).
+        Забранные, но не отправленные напоминания вернутся в базу.
+        """
+        self.stopping = True
+
+    async def run_job(self, context):
+        """Колбэк для JobQueue"""
+        try:
+            await self.run(context.bot)
+        except Exception:
+            logger.exception("Ошибка при отправке напоминаний")
+
+    async def run(self, bot):
+        """
+        Отправляем наступившие напоминания порциями.
+
+        Порция сразу отмечается в базе как обработанная (next_reminder_at
+        сдвигается на завтра), поэтому непрошедшие порции остаются
+        на следующий запуск, а отправленные не повторяются.
+
+        Возвращает:
+        (отправлено, пропущено - пользователь сегодня уже занимался)
+        """
+        deadline = time.monotonic() + self.time_budget
+        semaphore = asyncio.Semaphore(self.concurrency)
+        sent = skipped = 0
+
+        async def send_limited(telegram_id):
+            async with semaphore:
+                if self.stopping:
+                    return "skipped"
+                return await self.sender.send(bot, telegram_id, REMINDER_TEXT)
+
+        while time.monotonic() < deadline and not self.stopping:
+            now = int(time.time())
+            due = self.db.claim_due_reminders(now, self.batch_size)
+            if not due:
+                break
+
+            targets = [telegram_id for telegram_id, practiced_today in due if not practiced_today]
+            skipped += len(due) - len(targets)
+
+            results = await asyncio.gather(*(send_limited(telegram_id) for telegram_id in targets))
+            sent += results.count("delivered")
+
+            # Остановка посреди порции - неотправленные вернутся после запуска
+            unsent = [telegram_id for telegram_id, result in zip(targets, results) if result == "skipped"]
+            if unsent:
+                self.db.reset_reminders(unsent, now)
+
+            # Заблокировавшим бота больше не напоминаем
+            for telegram_id, result in zip(targets, results):
+                if result == "blocked":
+                    self.db.disable_reminder(telegram_id)
+
+            if len(due) < self.batch_size:
+                break
+
+        if sent or skipped:
+            logger.info("Напоминания: отправлено %d, уже занимались сегодня %d", sent, skipped)
+        return sent, skipped